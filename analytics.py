@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; rebucketing falls back to plain Python
+    np = None
+
+GRANULARITIES = ('day', 'week', 'month')
+GROUP_FIELDS = ('brand', 'status')
+METRICS = ('orders_count', 'units', 'revenue')
+
+
+# ========== BUCKET QUERIES ==========
+
+def load_daily_buckets(conn, start=None, end=None, brands=(), statuses=()):
+    """Read pre-aggregated daily buckets as (day, brand, status, orders_count, units, revenue) rows."""
+    conditions = []
+    params = []
+    if start:
+        conditions.append('day >= ?')
+        params.append(start)
+    if end:
+        conditions.append('day <= ?')
+        params.append(end)
+    if brands:
+        conditions.append(f"brand IN ({','.join('?' * len(brands))})")
+        params.extend(brands)
+    if statuses:
+        conditions.append(f"status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+
+    query = 'SELECT day, brand, status, orders_count, units, revenue FROM order_buckets'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY day'
+    return conn.execute(query, params).fetchall()
+
+
+# ========== RE-BUCKETING ==========
+
+def period_start(day, granularity):
+    if granularity == 'day':
+        return day
+    if granularity == 'month':
+        return day[:8] + '01'
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def rebucket(rows, granularity='day', group_by=()):
+    """Roll daily rows up to day/week/month periods, split by the group_by fields.
+
+    Weeks start on Monday. Returns a list of dicts ordered by period and group.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Invalid granularity, expected one of: {", ".join(GRANULARITIES)}')
+    for field in group_by:
+        if field not in GROUP_FIELDS:
+            raise ValueError(f'Invalid group_by, expected any of: {", ".join(GROUP_FIELDS)}')
+    if not rows:
+        return []
+    if np is not None:
+        return _rebucket_numpy(rows, granularity, group_by)
+    return _rebucket_python(rows, granularity, group_by)
+
+
+def _bucket(period, group_by, group_values, orders_count, units, revenue):
+    bucket = {'period': period}
+    bucket.update(zip(group_by, group_values))
+    bucket.update({'orders_count': int(orders_count), 'units': int(units), 'revenue': round(float(revenue), 2)})
+    return bucket
+
+
+def _rebucket_python(rows, granularity, group_by):
+    columns = [1 + GROUP_FIELDS.index(field) for field in group_by]
+    totals = {}
+    for row in rows:
+        key = (period_start(row[0], granularity),) + tuple(row[i] for i in columns)
+        acc = totals.setdefault(key, [0, 0, 0.0])
+        acc[0] += row[3]
+        acc[1] += row[4]
+        acc[2] += row[5]
+    return [_bucket(key[0], group_by, key[1:], *acc) for key, acc in sorted(totals.items())]
+
+
+def _rebucket_numpy(rows, granularity, group_by):
+    days, brands, statuses, orders_count, units, revenue = zip(*rows)
+    days = np.array(days, dtype='datetime64[D]')
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday, so (epoch day + 3) % 7 is the Monday-based weekday
+        periods = days - (days.astype('int64') + 3) % 7
+    elif granularity == 'month':
+        periods = days.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        periods = days
+
+    # Factorize every key column and fold them into one integer code per row
+    period_values, codes = np.unique(periods, return_inverse=True)
+    key_columns = [period_values]
+    source = {'brand': brands, 'status': statuses}
+    for field in group_by:
+        values, inverse = np.unique(np.array(source[field], dtype=object), return_inverse=True)
+        codes = codes * len(values) + inverse
+        key_columns.append(values)
+
+    unique_codes, groups = np.unique(codes, return_inverse=True)
+    sums = [np.bincount(groups, weights=np.asarray(metric, dtype=np.float64), minlength=len(unique_codes))
+            for metric in (orders_count, units, revenue)]
+
+    buckets = []
+    for i, code in enumerate(unique_codes):
+        parts = []
+        for values in reversed(key_columns[1:]):
+            code, index = divmod(int(code), len(values))
+            parts.append(values[index])
+        period = str(key_columns[0][code])
+        buckets.append(_bucket(period, group_by, reversed(parts), sums[0][i], sums[1][i], sums[2][i]))
+    return buckets
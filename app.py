@@ -1,81 +1,327 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, stream_with_context
+from functools import wraps
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import click
 import sqlite3
 import os
 import hashlib
 import secrets
 import json
-from datetime import datetime, timedelta
+import base64
+import csv
+import io
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from database import (DASHBOARD_STAT_FIELDS, DATABASE, ConnectionPool, apply_pragmas, full_table_scans,
+                      is_busy_error, migrate, pragmas_from_env, reap_expired_sessions, rebuild_indexes,
+                      rebuild_order_buckets, rebuild_sales_rollup, reconcile_dashboard_stats, schema_version,
+                      write_transaction, WriteQueue, WriteQueueBusy)
+from cache import CatalogCache, SessionCache
+from catalog_import import detect_format, import_phones, read_rows, text_stream
+from jobs import PeriodicJob
+from analytics import load_daily_buckets, rebucket
+from tokens import RevocationList, is_signed_token, now_ms, sign_token, token_user, verify_token
+from passwords import PasswordHasher, PasswordHasherBusy, default_workers
+from serialization import FastJSONProvider, dumps, row_mapper
+from compression import ResponseCompressor
+from metrics import QueryRecorder, RequestMetrics, instrumented_connection
+from ratelimit import (MemoryBuckets, RateLimiter, SharedMemoryBuckets, SQLiteBuckets, parse_limit,
+                       retry_after_header)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
-app.secret_key = 'phone-store-secret-key-2024'
+# Published with the source, so it must never be the key that signs auth tokens
+DEFAULT_SECRET_KEY = 'phone-store-secret-key-2024'
+app.secret_key = os.environ.get('SECRET_KEY', DEFAULT_SECRET_KEY)
+
+app.config['DATABASE'] = DATABASE
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 8))
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+app.config['DB_PRAGMAS'] = pragmas_from_env()
+app.config['DB_WRITE_RETRIES'] = int(os.environ.get('DB_WRITE_RETRIES', 5))
+app.config['IMPORT_CHUNK_SIZE'] = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+app.config['STATS_RECONCILE_INTERVAL'] = float(os.environ.get('STATS_RECONCILE_INTERVAL', 3600))
+app.config['SESSION_REAP_INTERVAL'] = float(os.environ.get('SESSION_REAP_INTERVAL', 300))
+app.config['SESSION_REAP_BATCH_SIZE'] = int(os.environ.get('SESSION_REAP_BATCH_SIZE', 500))
+# 'session' stores tokens in the sessions table; 'signed' issues HMAC-signed tokens verified in memory
+app.config['AUTH_TOKEN_MODE'] = os.environ.get('AUTH_TOKEN_MODE', 'session')
+# Signed tokens are only honoured in signed mode; set this to keep accepting them for a while
+# after switching back to session mode. Either way SECRET_KEY must be set to a private value.
+app.config['AUTH_ACCEPT_SIGNED_TOKENS'] = os.environ.get('AUTH_ACCEPT_SIGNED_TOKENS', '0') == '1'
+app.config['SESSION_LIFETIME'] = int(os.environ.get('SESSION_LIFETIME', 7 * 24 * 3600))
+app.config['TOKEN_REVOCATION_POLL'] = float(os.environ.get('TOKEN_REVOCATION_POLL', 2.0))
+app.config['PASSWORD_HASH_ALGORITHM'] = os.environ.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2_sha256')
+app.config['PASSWORD_HASH_COST'] = int(os.environ.get('PASSWORD_HASH_COST', 0)) or None
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', default_workers()))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+app.config['SESSION_CACHE_SIZE'] = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+app.config['SESSION_CACHE_TTL'] = float(os.environ.get('SESSION_CACHE_TTL', 60))
+# Seconds between reads of the session invalidation log written by other workers
+app.config['SESSION_CACHE_POLL'] = float(os.environ.get('SESSION_CACHE_POLL', 1.0))
+app.config['CATALOG_CACHE_SIZE'] = int(os.environ.get('CATALOG_CACHE_SIZE', 512))
+app.config['CATALOG_VERSION_POLL'] = float(os.environ.get('CATALOG_VERSION_POLL', 1.0))
+app.config['SLOW_QUERY_THRESHOLD_MS'] = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+# GET /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>". Without a token it is only
+# served in debug mode (python app.py); GET /api/db-check always requires an admin session.
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '')
+app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+app.config['COMPRESSION_GZIP_LEVEL'] = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+app.config['COMPRESSION_CACHE_SIZE'] = int(os.environ.get('COMPRESSION_CACHE_SIZE', 256))
+# Group commit: request threads hand their writes to one writer thread per process, which commits
+# them in batches. Its connection runs with WRITE_QUEUE_SYNCHRONOUS so an acknowledged write is on disk.
+app.config['WRITE_QUEUE_ENABLED'] = os.environ.get('WRITE_QUEUE_ENABLED', '0') == '1'
+app.config['WRITE_QUEUE_MAX_BATCH'] = int(os.environ.get('WRITE_QUEUE_MAX_BATCH', 64))
+app.config['WRITE_QUEUE_MAX_DELAY_MS'] = float(os.environ.get('WRITE_QUEUE_MAX_DELAY_MS', 2))
+app.config['WRITE_QUEUE_MAX_PENDING'] = int(os.environ.get('WRITE_QUEUE_MAX_PENDING', 1024))
+app.config['WRITE_QUEUE_SYNCHRONOUS'] = os.environ.get('WRITE_QUEUE_SYNCHRONOUS', 'FULL')
+# Seconds a request waits for its write to commit before answering 503
+app.config['WRITE_QUEUE_TIMEOUT'] = float(os.environ.get('WRITE_QUEUE_TIMEOUT', 30))
+# Rate limits are "<requests>/<seconds>" token buckets; an empty value or 0 turns one off.
+# The shared store is one table for all server.py workers; sqlite uses a separate file.
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+app.config['RATE_LIMIT_STORE'] = os.environ.get('RATE_LIMIT_STORE', 'shared')
+app.config['RATE_LIMIT_DATABASE'] = os.environ.get('RATE_LIMIT_DATABASE',
+                                                   os.path.splitext(DATABASE)[0] + '.ratelimit.db')
+app.config['RATE_LIMIT_SLOTS'] = int(os.environ.get('RATE_LIMIT_SLOTS', 65536))
+# The "ip" budgets are keyed on the client address. Behind a reverse proxy every request arrives from
+# the proxy, so all clients would share one budget: set TRUSTED_PROXY_COUNT to the number of proxies
+# in front of the app and the address is taken from X-Forwarded-For instead. Leave it at 0 when clients
+# connect directly, or anyone could pick their own address with a forged header.
+app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+app.config['RATE_LIMITS'] = {
+    'login': {'ip': parse_limit(os.environ.get('RATE_LIMIT_LOGIN_IP', '30/60')),
+              'user': parse_limit(os.environ.get('RATE_LIMIT_LOGIN_USER', '10/60'))},
+    'register': {'ip': parse_limit(os.environ.get('RATE_LIMIT_REGISTER_IP', '10/600'))},
+    'orders': {'ip': parse_limit(os.environ.get('RATE_LIMIT_ORDERS_IP', '120/60')),
+               'user': parse_limit(os.environ.get('RATE_LIMIT_ORDERS_USER', '30/60'))}
+}
+
+if app.config['TRUSTED_PROXY_COUNT'] > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'],
+                            x_proto=app.config['TRUSTED_PROXY_COUNT'])
+
+query_recorder = QueryRecorder(slow_threshold=app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000)
+request_metrics = RequestMetrics()
+db_pool = ConnectionPool(app.config['DATABASE'],
+                         size=app.config['DB_POOL_SIZE'],
+                         timeout=app.config['DB_POOL_TIMEOUT'],
+                         pragmas=app.config['DB_PRAGMAS'],
+                         factory=instrumented_connection(query_recorder))
+write_queue = WriteQueue(app.config['DATABASE'],
+                         pragmas=dict(app.config['DB_PRAGMAS'], synchronous=app.config['WRITE_QUEUE_SYNCHRONOUS']),
+                         factory=instrumented_connection(query_recorder),
+                         timeout=app.config['DB_POOL_TIMEOUT'],
+                         max_batch=app.config['WRITE_QUEUE_MAX_BATCH'],
+                         max_delay=app.config['WRITE_QUEUE_MAX_DELAY_MS'] / 1000,
+                         max_pending=app.config['WRITE_QUEUE_MAX_PENDING'],
+                         retries=app.config['DB_WRITE_RETRIES'],
+                         result_timeout=app.config['WRITE_QUEUE_TIMEOUT'])
+session_cache = SessionCache(max_size=app.config['SESSION_CACHE_SIZE'],
+                             ttl=app.config['SESSION_CACHE_TTL'],
+                             poll_interval=app.config['SESSION_CACHE_POLL'])
+revocations = RevocationList(poll_interval=app.config['TOKEN_REVOCATION_POLL'])
+catalog_cache = CatalogCache(max_entries=app.config['CATALOG_CACHE_SIZE'],
+                             poll_interval=app.config['CATALOG_VERSION_POLL'])
+compressor = ResponseCompressor(min_size=app.config['COMPRESSION_MIN_SIZE'],
+                                gzip_level=app.config['COMPRESSION_GZIP_LEVEL'],
+                                brotli_quality=app.config['COMPRESSION_BROTLI_QUALITY'],
+                                cache_size=app.config['COMPRESSION_CACHE_SIZE'])
+
+def make_rate_limit_buckets(store):
+    if store == 'memory':
+        return MemoryBuckets()
+    if store == 'sqlite':
+        return SQLiteBuckets(app.config['RATE_LIMIT_DATABASE'])
+    if store == 'shared':
+        return SharedMemoryBuckets(slots=app.config['RATE_LIMIT_SLOTS'])
+    raise ValueError(f'Unknown RATE_LIMIT_STORE {store!r}, expected memory, shared or sqlite')
+
+rate_limiter = RateLimiter(make_rate_limit_buckets(app.config['RATE_LIMIT_STORE']),
+                           {route: {scope: limit for scope, limit in budgets.items() if limit}
+                            for route, budgets in app.config['RATE_LIMITS'].items()},
+                           enabled=app.config['RATE_LIMIT_ENABLED'])
+password_hasher = PasswordHasher(algorithm=app.config['PASSWORD_HASH_ALGORITHM'],
+                                 cost=app.config['PASSWORD_HASH_COST'],
+                                 max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                 max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+                                 queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'])
+
+# ========== DATABASE CONNECTIONS ==========
+
+def get_db():
+    # One pooled connection per request, shared by authenticate_user and the handler
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+def run_write(work):
+    # Run work(cursor) in a committed write transaction and return its result: batched with
+    # other requests' writes by write_queue when it is enabled, else on this request's connection
+    if app.config['WRITE_QUEUE_ENABLED']:
+        return write_queue.submit(work)
+    return write_transaction(get_db(), work, retries=app.config['DB_WRITE_RETRIES'])
+
+# ========== REQUEST METRICS ==========
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    query_recorder.start()
+
+@app.after_request
+def record_request_metrics(response):
+    # Registered before the other after_request hooks, so it runs last and includes them
+    started = g.pop('request_started', None)
+    if started is not None:
+        statements, sql_seconds = query_recorder.stop()
+        request_metrics.observe(request.endpoint or 'unmatched', request.method, response.status_code,
+                                time.perf_counter() - started, statements, sql_seconds)
+    return response
+
+# ========== CONDITIONAL GET AND COMPRESSION ==========
+
+conditional_stats = {'etags_added': 0, 'not_modified': 0}
+
+@app.after_request
+def compress_response(response):
+    # Runs for every response. Successful GETs without their own validator get a
+    # body-hash ETag, so a client polling an unchanged listing gets an empty 304.
+    if request.method in ('GET', 'HEAD') and response.status_code == 200 and not response.is_streamed:
+        if 'ETag' not in response.headers:
+            response.add_etag()
+            conditional_stats['etags_added'] += 1
+        response.make_conditional(request)
+    if response.status_code == 304:
+        conditional_stats['not_modified'] += 1
+        return response
+    
+    if response.status_code != 200 or not compressor.is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not response.is_streamed and len(response.get_data()) < compressor.min_size:
+        compressor.record_skipped()
+        return response
+    
+    encoding = request.accept_encodings.best_match(compressor.encodings)
+    if not encoding:
+        return response
+    
+    response.headers['Content-Encoding'] = encoding
+    if response.is_streamed:
+        response.response = compressor.compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+        return response
+    
+    etag, weak = response.get_etag()
+    # Public payloads with a strong ETag (the catalog) are compressed once per ETag
+    cacheable = etag and not weak and response.cache_control.public
+    response.set_data(compressor.compress_body(response.get_data(), encoding, etag if cacheable else None))
+    if etag:
+        # The compressed bytes are a different representation; a weak ETag still
+        # matches If-None-Match, which uses weak comparison
+        response.set_etag(etag, weak=True)
+    return response
+
+# ========== BACKGROUND JOBS ==========
+
+background_jobs = {}
 
+def with_pooled_connection(work):
+    def run():
+        conn = db_pool.acquire()
+        try:
+            work(conn)
+        finally:
+            db_pool.release(conn)
+    return run
 
+def reconcile_stats_job(conn):
+    drifted = reconcile_dashboard_stats(conn)
+    if drifted:
+        print(f"⚠️ Dashboard stats drift corrected: {', '.join(drifted)}")
+
+session_reaper_stats = {'rows_reaped': 0, 'last_reaped': 0, 'sessions_total': None, 'sessions_expired': None}
+
+def reap_sessions_job(conn):
+    reaped = reap_expired_sessions(conn, batch_size=app.config['SESSION_REAP_BATCH_SIZE'])
+    # Both counts are answered from indexes (idx_sessions_user_id / idx_sessions_expires_at)
+    total, expired = conn.execute('''SELECT COUNT(*),
+                                          (SELECT COUNT(*) FROM sessions WHERE expires_at <= datetime('now'))
+                                   FROM sessions''').fetchone()
+    # Revocations only matter until the tokens they cover would have expired anyway
+    def prune_revocations(c):
+        cutoff = now_ms()
+        c.execute('DELETE FROM token_revocations WHERE expires_at <= ?', (cutoff,))
+        c.execute('DELETE FROM user_revocations WHERE revoked_before <= ?',
+                  (cutoff - app.config['SESSION_LIFETIME'] * 1000,))
+        # Every worker has polled these long before; the id sequence keeps growing regardless
+        c.execute("DELETE FROM session_invalidations WHERE created_at <= datetime('now', '-1 hour')")
+    write_transaction(conn, prune_revocations)
+    session_reaper_stats['rows_reaped'] += reaped
+    session_reaper_stats['last_reaped'] = reaped
+    session_reaper_stats['sessions_total'] = total
+    session_reaper_stats['sessions_expired'] = expired
+
+def start_background_jobs():
+    jobs = [
+        ('stats-reconciler', app.config['STATS_RECONCILE_INTERVAL'], reconcile_stats_job),
+        ('session-reaper', app.config['SESSION_REAP_INTERVAL'], reap_sessions_job)
+    ]
+    for name, interval, work in jobs:
+        if interval > 0 and name not in background_jobs:
+            job = PeriodicJob(name, interval, with_pooled_connection(work))
+            background_jobs[name] = job
+            job.start()
+
+def stop_background_jobs(timeout=5.0):
+    for job in background_jobs.values():
+        job.stop()
+    for job in background_jobs.values():
+        job.join(timeout)
+
+# ========== SERVER WORKERS ==========
+
+def init_worker(run_jobs=False):
+    # Called in each process forked by server.py, after init_db ran once in the master
+    db_pool.after_fork()
+    password_hasher.after_fork()
+    rate_limiter.after_fork()
+    write_queue.after_fork()
+    if run_jobs:
+        start_background_jobs()
+
+def shutdown_worker():
+    stop_background_jobs()
+    write_queue.shutdown()
+    password_hasher.shutdown()
+    db_pool.close_all()
 
 def init_db():
     print("🔧 Starting database initialization...")
     
-    db_exists = os.path.exists('phone_store.db')
+    db_exists = os.path.exists(app.config['DATABASE'])
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = sqlite3.connect(app.config['DATABASE'])
+    apply_pragmas(conn, app.config['DB_PRAGMAS'])
     c = conn.cursor()
     
     try:
-        # Create phones table only if it doesn't exist
-        c.execute('''CREATE TABLE IF NOT EXISTS phones
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      brand TEXT NOT NULL,
-                      model TEXT NOT NULL,
-                      price REAL NOT NULL,
-                      storage TEXT NOT NULL,
-                      color TEXT NOT NULL,
-                      stock_quantity INTEGER NOT NULL,
-                      description TEXT,
-                      image_url TEXT,
-                      created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        print("✅ Phones table checked/created")
-        
-        # Create orders table only if it doesn't exist
-        c.execute('''CREATE TABLE IF NOT EXISTS orders
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      phone_id INTEGER,
-                      customer_name TEXT NOT NULL,
-                      customer_email TEXT NOT NULL,
-                      customer_phone TEXT NOT NULL,
-                      quantity INTEGER NOT NULL,
-                      total_price REAL NOT NULL,
-                      status TEXT DEFAULT 'pending',
-                      house_number TEXT,
-                      street_address TEXT,
-                      delivery_city TEXT,
-                      delivery_state TEXT,
-                      delivery_zip TEXT,
-                      delivery_country TEXT,
-                      delivery_notes TEXT,
-                      created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                      FOREIGN KEY (phone_id) REFERENCES phones (id))''')
-        print("✅ Orders table checked/created")
-        
-        # Create users table only if it doesn't exist
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      username TEXT UNIQUE NOT NULL,
-                      email TEXT UNIQUE NOT NULL,
-                      password_hash TEXT NOT NULL,
-                      is_admin BOOLEAN DEFAULT FALSE,
-                      created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        print("✅ Users table checked/created")
-        
-        # Create sessions table only if it doesn't exist
-        c.execute('''CREATE TABLE IF NOT EXISTS sessions
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      user_id INTEGER,
-                      session_token TEXT UNIQUE NOT NULL,
-                      created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                      expires_at DATETIME,
-                      FOREIGN KEY (user_id) REFERENCES users (id))''')
-        print("✅ Sessions table checked/created")
+        applied = migrate(conn)
+        for version, name in applied:
+            print(f"✅ Applied migration {version}: {name}")
+        print(f"✅ Schema at version {schema_version(conn)} ({conn.execute('PRAGMA journal_mode').fetchone()[0]} journal)")
         
         # Only insert sample data if database is newly created
         if not db_exists:
@@ -107,12 +353,12 @@ def init_db():
             
             # Create default admin user
             admin_password = "admin123"
-            password_hash = hashlib.sha256(admin_password.encode()).hexdigest()
+            password_hash = password_hasher.hash(admin_password)
             c.execute('INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)',
                       ('admin', 'admin@phonestore.com', password_hash, True))
             
             # Create a sample regular user
-            user_password = hashlib.sha256("user123".encode()).hexdigest()
+            user_password = password_hasher.hash("user123")
             c.execute('INSERT INTO users (username, email, password_hash, is_admin) VALUES (?, ?, ?, ?)',
                       ('user', 'user@example.com', user_password, False))
             
@@ -149,8 +395,35 @@ def init_db():
     finally:
         conn.close()
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# Route SQL that check-query-plans also runs, so the check sees exactly what the routes execute
+AUTH_SESSION_QUERY = '''SELECT u.id, u.username, u.email, u.is_admin, CAST(strftime('%s', s.expires_at) AS INTEGER)
+                        FROM users u 
+                        JOIN sessions s ON u.id = s.user_id 
+                        WHERE s.session_token = ? AND s.expires_at > datetime('now')'''
+CLEAR_USER_SESSIONS_SQL = 'DELETE FROM sessions WHERE user_id = ?'
+
+def load_session_invalidations(after_id):
+    conn = get_db()
+    if after_id is None:
+        return conn.execute('SELECT MAX(id), NULL FROM session_invalidations').fetchall()
+    return conn.execute('SELECT id, user_id FROM session_invalidations WHERE id > ? ORDER BY id',
+                        (after_id,)).fetchall()
+
+def signed_tokens_accepted():
+    return app.config['AUTH_TOKEN_MODE'] == 'signed' or app.config['AUTH_ACCEPT_SIGNED_TOKENS']
+
+def check_token_secret():
+    # Anyone can sign tokens with the published default key, so refuse to start with it
+    if signed_tokens_accepted() and app.secret_key in ('', DEFAULT_SECRET_KEY):
+        raise RuntimeError('Signed auth tokens require SECRET_KEY to be set to a private value')
+
+check_token_secret()
+
+def verify_signed_token(token):
+    # A signed token is worthless unless signed tokens are enabled, whoever signed it
+    if not signed_tokens_accepted():
+        return None
+    return verify_token(app.secret_key, token)
 
 def authenticate_user():
     token = request.headers.get('Authorization')
@@ -159,19 +432,40 @@ def authenticate_user():
     
     token = token[7:]  # Remove 'Bearer ' prefix
     
-    conn = sqlite3.connect('phone_store.db')
+    if is_signed_token(token):
+        payload = verify_signed_token(token)
+        if not payload:
+            return None
+        revocations.refresh(get_db)
+        if revocations.is_revoked(payload):
+            return None
+        return token_user(payload)
+    
+    session_cache.sync(load_session_invalidations)
+    cached = session_cache.get(token)
+    if cached:
+        return cached
+    
+    conn = get_db()
     c = conn.cursor()
-    c.execute('''SELECT u.id, u.username, u.email, u.is_admin 
-                 FROM users u 
-                 JOIN sessions s ON u.id = s.user_id 
-                 WHERE s.session_token = ? AND s.expires_at > datetime('now')''', (token,))
+    c.execute(AUTH_SESSION_QUERY, (token,))
     user = c.fetchone()
-    conn.close()
     
     if user:
-        return {'id': user[0], 'username': user[1], 'email': user[2], 'is_admin': bool(user[3])}
+        user_data = {'id': user[0], 'username': user[1], 'email': user[2], 'is_admin': bool(user[3])}
+        session_cache.set(token, user_data, user[4])
+        return user_data
     return None
 
+def create_session_token(c, user):
+    if app.config['AUTH_TOKEN_MODE'] == 'signed':
+        return sign_token(app.secret_key, user, app.config['SESSION_LIFETIME'])
+    
+    session_token = secrets.token_hex(32)
+    c.execute("INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?, ?, datetime('now', ?))",
+              (user['id'], session_token, f"+{app.config['SESSION_LIFETIME']} seconds"))
+    return session_token
+
 def require_admin():
     user = authenticate_user()
     if not user:
@@ -180,9 +474,51 @@ def require_admin():
         return jsonify({'error': 'Admin privileges required'}), 403
     return user
 
+# ========== RATE LIMITING ==========
+
+def login_attempt_key():
+    data = request.get_json(silent=True)
+    return data.get('username') if isinstance(data, dict) else None
+
+def order_user_key():
+    # Identify the customer without touching the database: signed tokens carry the user id
+    # and database sessions are usually in session_cache; anything else is keyed by the token
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer ') or len(header) == 7:
+        return None
+    token = header[7:]
+    if is_signed_token(token):
+        payload = verify_signed_token(token)
+        return payload['uid'] if payload else None
+    cached = session_cache.get(token)
+    if cached:
+        return cached['id']
+    return 'token:' + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+def rate_limited(route, user_key=None):
+    # Checked before the view runs, so a rejected request costs no hashing and no database work
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # remote_addr is the X-Forwarded-For client when TRUSTED_PROXY_COUNT is set (see ProxyFix above)
+            keys = {'ip': request.remote_addr}
+            if user_key is not None:
+                keys['user'] = user_key()
+            retry_after = rate_limiter.check(route, keys)
+            if retry_after:
+                response = jsonify({'error': 'Too many requests, please retry later',
+                                    'retry_after': round(retry_after, 1)})
+                response.status_code = 429
+                response.headers['Retry-After'] = retry_after_header(retry_after)
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
 # ========== AUTHENTICATION ENDPOINTS ==========
 
 @app.route('/api/register', methods=['POST'])
+@rate_limited('register')
 def register():
     data = request.json
     username = data.get('username')
@@ -195,39 +531,40 @@ def register():
     if len(password) < 6:
         return jsonify({'error': 'Password must be at least 6 characters'}), 400
     
-    password_hash = hash_password(password)
-    
-    conn = sqlite3.connect('phone_store.db')
-    c = conn.cursor()
-    
     try:
+        password_hash = password_hasher.hash(password)
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503
+    
+    user = {
+        'id': None,
+        'username': username, 
+        'email': email,
+        'is_admin': False
+    }
+    
+    def create_user(c):
         c.execute('INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
                   (username, email, password_hash))
-        user_id = c.lastrowid
-        
-        session_token = secrets.token_hex(32)
-        c.execute('INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?, ?, datetime("now", "+7 days"))',
-                  (user_id, session_token))
-        
-        conn.commit()
+        user['id'] = c.lastrowid
+        return create_session_token(c, user)
+    
+    try:
+        session_token = run_write(create_user)
         
         return jsonify({
             'message': 'Registration successful',
             'session_token': session_token,
-            'user': {
-                'id': user_id, 
-                'username': username, 
-                'email': email,
-                'is_admin': False
-            }
+            'user': user
         }), 201
         
     except sqlite3.IntegrityError:
         return jsonify({'error': 'Username or email already exists'}), 400
-    finally:
-        conn.close()
+    except WriteQueueBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503
 
 @app.route('/api/login', methods=['POST'])
+@rate_limited('login', user_key=login_attempt_key)
 def login():
     data = request.json
     username = data.get('username')
@@ -236,39 +573,52 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password are required'}), 400
     
-    password_hash = hash_password(password)
-    
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
-    c.execute('SELECT id, username, email, is_admin FROM users WHERE username = ? AND password_hash = ?', 
-              (username, password_hash))
+    c.execute('SELECT id, username, email, is_admin, password_hash FROM users WHERE username = ?', (username,))
     user = c.fetchone()
+    # Give the connection back while the slow hash runs so logins don't tie up the pool
+    release_db()
     
-    if user:
-        user_id, username, email, is_admin = user
-        
-        # Clear existing sessions
-        c.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+    try:
+        valid, upgraded_hash = password_hasher.verify(password, user[4] if user else None)
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503
+    
+    if user and valid:
+        user_id, username, email, is_admin, _ = user
+        user = {
+            'id': user_id, 
+            'username': username, 
+            'email': email,
+            'is_admin': bool(is_admin)
+        }
         
-        session_token = secrets.token_hex(32)
-        c.execute('INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?, ?, datetime("now", "+7 days"))',
-                  (user_id, session_token))
+        def start_session(c):
+            # Legacy SHA-256 hashes and outdated cost settings are upgraded on the first good login
+            if upgraded_hash:
+                c.execute('UPDATE users SET password_hash = ? WHERE id = ?', (upgraded_hash, user_id))
+            # Clear existing sessions
+            if app.config['AUTH_TOKEN_MODE'] != 'signed':
+                c.execute(CLEAR_USER_SESSIONS_SQL, (user_id,))
+            return create_session_token(c, user)
         
-        conn.commit()
-        conn.close()
+        # Signed tokens have no rows, so unless the hash is upgraded login stays read-only
+        if app.config['AUTH_TOKEN_MODE'] == 'signed' and not upgraded_hash:
+            session_token = create_session_token(None, user)
+        else:
+            try:
+                session_token = run_write(start_session)
+            except WriteQueueBusy:
+                return jsonify({'error': 'Server busy, please retry'}), 503
+            session_cache.invalidate_user(user_id)
         
         return jsonify({
             'message': 'Login successful',
             'session_token': session_token,
-            'user': {
-                'id': user_id, 
-                'username': username, 
-                'email': email,
-                'is_admin': bool(is_admin)
-            }
+            'user': user
         }), 200
     else:
-        conn.close()
         return jsonify({'error': 'Invalid username or password'}), 401
 
 @app.route('/api/logout', methods=['POST'])
@@ -276,11 +626,16 @@ def logout():
     token = request.headers.get('Authorization')
     if token and token.startswith('Bearer '):
         token = token[7:]
-        conn = sqlite3.connect('phone_store.db')
-        c = conn.cursor()
-        c.execute('DELETE FROM sessions WHERE session_token = ?', (token,))
-        conn.commit()
-        conn.close()
+        if is_signed_token(token):
+            payload = verify_signed_token(token)
+            if payload:
+                revocations.revoke_token(get_db(), payload)
+        else:
+            try:
+                run_write(lambda c: c.execute('DELETE FROM sessions WHERE session_token = ?', (token,)))
+            except WriteQueueBusy:
+                return jsonify({'error': 'Server busy, please retry'}), 503
+            session_cache.invalidate_token(token)
     
     return jsonify({'message': 'Logout successful'}), 200
 
@@ -306,7 +661,7 @@ def update_user_profile():
     if not new_username or not new_email:
         return jsonify({'error': 'Username and email are required'}), 400
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     try:
@@ -316,113 +671,67 @@ def update_user_profile():
         existing_user = c.fetchone()
         
         if existing_user:
-            conn.close()
             return jsonify({'error': 'Username or email already exists'}), 400
         
-        # Update user profile
-        c.execute('UPDATE users SET username = ?, email = ? WHERE id = ?', 
-                  (new_username, new_email, user['id']))
+        updated_user = {
+            'id': user['id'],
+            'username': new_username,
+            'email': new_email,
+            'is_admin': user['is_admin']
+        }
         
-        # Update session user data
-        c.execute('UPDATE sessions SET expires_at = datetime("now") WHERE user_id = ?', (user['id'],))
-        
-        # Create new session
-        session_token = secrets.token_hex(32)
-        c.execute('INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?, ?, datetime("now", "+7 days"))',
-                  (user['id'], session_token))
+        def update_profile(c):
+            # Update user profile
+            c.execute('UPDATE users SET username = ?, email = ? WHERE id = ?', 
+                      (new_username, new_email, user['id']))
+            
+            # Update session user data: end existing sessions and signed tokens
+            c.execute('UPDATE sessions SET expires_at = datetime("now") WHERE user_id = ?', (user['id'],))
+            revoked_before = revocations.revoke_user(c, user['id'], commit=False)
+            
+            # Create new session
+            return create_session_token(c, updated_user), revoked_before
         
-        conn.commit()
-        conn.close()
+        # Only mirror the revocation once it has committed: a rolled-back intent must change nothing
+        session_token, revoked_before = run_write(update_profile)
+        revocations.record_user(user['id'], revoked_before)
+        session_cache.invalidate_user(user['id'])
         
         return jsonify({
             'message': 'Profile updated successfully',
             'session_token': session_token,
-            'user': {
-                'id': user['id'],
-                'username': new_username,
-                'email': new_email,
-                'is_admin': user['is_admin']
-            }
+            'user': updated_user
         }), 200
         
+    except WriteQueueBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503
     except sqlite3.Error as e:
-        conn.close()
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
 # ========== USER ORDER HISTORY ENDPOINT ==========
 
+# Regular users only get city and state, and both are masked for privacy
+masked_order_to_dict = row_mapper(['id', 'phone_id', 'customer_name', 'customer_email', 'customer_phone', 'quantity',
+                                   'total_price', 'status', 'created_at', 'brand', 'model', 'storage', 'color',
+                                   'delivery_city', 'delivery_state'])
+
 @app.route('/api/user/orders', methods=['GET'])
 def get_user_orders():
     user = authenticate_user()
     if not user:
         return jsonify({'error': 'Authentication required'}), 401
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     if user['is_admin']:
         # Admin sees all orders with full address
-        c.execute('''SELECT o.*, p.brand, p.model, p.storage, p.color 
-                     FROM orders o 
-                     JOIN phones p ON o.phone_id = p.id 
-                     ORDER BY o.created_at DESC''')
+        c.execute(ADMIN_USER_ORDERS_QUERY)
+        orders = [order_to_dict(row) for row in c.fetchall()]
     else:
         # Regular users see only their orders (filter by username/email) with limited address info
-        c.execute('''SELECT o.id, o.phone_id, o.customer_name, o.customer_email, o.customer_phone, 
-                            o.quantity, o.total_price, o.status, o.created_at,
-                            p.brand, p.model, p.storage, p.color 
-                     FROM orders o 
-                     JOIN phones p ON o.phone_id = p.id 
-                     WHERE o.customer_name = ? OR o.customer_email = ?
-                     ORDER BY o.created_at DESC''', 
-                  (user['username'], user['username']))
-    
-    orders = []
-    for row in c.fetchall():
-        if user['is_admin']:
-            # Admin gets full address details
-            orders.append({
-                'id': row[0],
-                'phone_id': row[1],
-                'customer_name': row[2],
-                'customer_email': row[3],
-                'customer_phone': row[4],
-                'quantity': row[5],
-                'total_price': row[6],
-                'status': row[7],
-                'house_number': row[8],
-                'street_address': row[9],
-                'delivery_city': row[10],
-                'delivery_state': row[11],
-                'delivery_zip': row[12],
-                'delivery_country': row[13],
-                'delivery_notes': row[14],
-                'created_at': row[15],
-                'brand': row[16],
-                'model': row[17],
-                'storage': row[18],
-                'color': row[19]
-            })
-        else:
-            # Regular users only get city and state
-            orders.append({
-                'id': row[0],
-                'phone_id': row[1],
-                'customer_name': row[2],
-                'customer_email': row[3],
-                'customer_phone': row[4],
-                'quantity': row[5],
-                'total_price': row[6],
-                'status': row[7],
-                'created_at': row[8],
-                'brand': row[9],
-                'model': row[10],
-                'storage': row[11],
-                'color': row[12],
-                'delivery_city': '***',  # Masked for privacy
-                'delivery_state': '***'  # Masked for privacy
-            })
-    conn.close()
+        c.execute(CUSTOMER_ORDERS_QUERY, (user['username'], user['username']))
+        orders = [masked_order_to_dict(row) for row in c.fetchall()]
     return jsonify({'orders': orders})
 
 # ========== ADMIN CRUD ENDPOINTS ==========
@@ -446,7 +755,7 @@ def add_phone():
     except (ValueError, TypeError):
         return jsonify({'error': 'Invalid price or stock quantity format'}), 400
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     try:
@@ -459,6 +768,7 @@ def add_phone():
         
         phone_id = c.lastrowid
         conn.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             'message': 'Phone added successfully',
@@ -467,8 +777,6 @@ def add_phone():
         
     except sqlite3.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/admin/phones/<int:phone_id>', methods=['PUT'])
 def update_phone(phone_id):
@@ -478,13 +786,12 @@ def update_phone(phone_id):
     
     data = request.json
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     # Check if phone exists
     c.execute('SELECT id FROM phones WHERE id = ?', (phone_id,))
     if not c.fetchone():
-        conn.close()
         return jsonify({'error': 'Phone not found'}), 404
     
     update_fields = []
@@ -498,7 +805,6 @@ def update_phone(phone_id):
             update_values.append(data[field])
     
     if not update_fields:
-        conn.close()
         return jsonify({'error': 'No valid fields to update'}), 400
     
     update_values.append(phone_id)
@@ -507,13 +813,12 @@ def update_phone(phone_id):
         query = f"UPDATE phones SET {', '.join(update_fields)} WHERE id = ?"
         c.execute(query, update_values)
         conn.commit()
+        catalog_cache.invalidate()
         
         return jsonify({'message': 'Phone updated successfully'}), 200
         
     except sqlite3.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
-    finally:
-        conn.close()
 
 @app.route('/api/admin/phones/<int:phone_id>', methods=['DELETE'])
 def delete_phone(phone_id):
@@ -521,47 +826,66 @@ def delete_phone(phone_id):
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     # Check if phone exists
     c.execute('SELECT id FROM phones WHERE id = ?', (phone_id,))
     if not c.fetchone():
-        conn.close()
         return jsonify({'error': 'Phone not found'}), 404
     
     try:
         c.execute("DELETE FROM phones WHERE id = ?", (phone_id,))
         conn.commit()
+        catalog_cache.invalidate()
         return jsonify({'message': 'Phone deleted successfully'}), 200
     except sqlite3.Error as e:
         return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/api/admin/phones/import', methods=['POST'])
+def import_phones_endpoint():
+    # Bulk upsert by sku. Send CSV (text/csv) or JSON Lines (application/x-ndjson)
+    # as the request body or as a multipart "file" upload; ?format= overrides detection.
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    upload = request.files.get('file')
+    if upload:
+        fmt = request.args.get('format') or detect_format(upload.mimetype, upload.filename)
+        stream = text_stream(upload.stream)
+    else:
+        fmt = request.args.get('format') or detect_format(request.content_type)
+        stream = text_stream(request.stream)
+    
+    try:
+        report = import_phones(get_db(), read_rows(stream, fmt),
+                               chunk_size=app.config['IMPORT_CHUNK_SIZE'],
+                               retries=app.config['DB_WRITE_RETRIES'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
     finally:
-        conn.close()
+        catalog_cache.invalidate()
+    
+    return jsonify(dict(report, message='Import completed')), 200
 
 # ========== ADMIN USER MANAGEMENT ENDPOINTS ==========
 
+user_to_dict = row_mapper(['id', 'username', 'email', 'is_admin', 'created_at'], {'is_admin': bool})
+
 @app.route('/api/admin/users', methods=['GET'])
 def get_all_users():
     admin = require_admin()
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     c.execute('SELECT id, username, email, is_admin, created_at FROM users ORDER BY created_at DESC')
     
-    users = []
-    for row in c.fetchall():
-        users.append({
-            'id': row[0],
-            'username': row[1],
-            'email': row[2],
-            'is_admin': bool(row[3]),
-            'created_at': row[4]
-        })
-    conn.close()
-    return jsonify({'users': users})
+    return jsonify({'users': [user_to_dict(row) for row in c.fetchall()]})
 
 @app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
@@ -573,7 +897,7 @@ def delete_user(user_id):
     if admin['id'] == user_id:
         return jsonify({'error': 'Cannot delete your own account'}), 400
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     # Check if user exists
@@ -581,92 +905,129 @@ def delete_user(user_id):
     user = c.fetchone()
     
     if not user:
-        conn.close()
         return jsonify({'error': 'User not found'}), 404
     
     # Delete user sessions first
-    c.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+    c.execute(CLEAR_USER_SESSIONS_SQL, (user_id,))
+    revoked_before = revocations.revoke_user(conn, user_id, commit=False)
     # Delete user
     c.execute('DELETE FROM users WHERE id = ?', (user_id,))
     
     conn.commit()
-    conn.close()
+    revocations.record_user(user_id, revoked_before)
+    session_cache.invalidate_user(user_id)
     
     return jsonify({'message': 'User deleted successfully'})
 
 # ========== ADMIN DASHBOARD STATS ==========
 
+DASHBOARD_STATS_QUERY = f"SELECT {', '.join(DASHBOARD_STAT_FIELDS)} FROM dashboard_stats WHERE id = 1"
+# The last 7 daily order buckets, today included: a short range on the order_buckets primary key
+RECENT_ORDERS_QUERY = '''SELECT COALESCE(SUM(orders_count), 0) FROM order_buckets 
+                         WHERE day >= date('now', '-6 days')'''
+
 @app.route('/api/admin/stats', methods=['GET'])
 def get_admin_stats():
     admin = require_admin()
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
-    # Total users
-    c.execute('SELECT COUNT(*) FROM users')
-    total_users = c.fetchone()[0]
-    
-    # Total orders
-    c.execute('SELECT COUNT(*) FROM orders')
-    total_orders = c.fetchone()[0]
-    
-    # Total revenue
-    c.execute('SELECT SUM(total_price) FROM orders WHERE status != "cancelled"')
-    total_revenue = c.fetchone()[0] or 0
-    
-    # Low stock items
-    c.execute('SELECT COUNT(*) FROM phones WHERE stock_quantity <= 10 AND stock_quantity > 0')
-    low_stock = c.fetchone()[0]
-    
-    # Out of stock items
-    c.execute('SELECT COUNT(*) FROM phones WHERE stock_quantity = 0')
-    out_of_stock = c.fetchone()[0]
+    # Counters maintained by triggers (see dashboard_stats migration)
+    c.execute(DASHBOARD_STATS_QUERY)
+    stats = dict(zip(DASHBOARD_STAT_FIELDS, c.fetchone()))
     
-    # Recent orders (last 7 days)
-    c.execute('''SELECT COUNT(*) FROM orders 
-                 WHERE created_at >= datetime('now', '-7 days')''')
+    # Recent orders (last 7 days) from the trigger-maintained daily buckets
+    c.execute(RECENT_ORDERS_QUERY)
     recent_orders = c.fetchone()[0]
     
-    conn.close()
-    
     return jsonify({
-        'total_users': total_users,
-        'total_orders': total_orders,
-        'total_revenue': float(total_revenue),
-        'low_stock_items': low_stock,
-        'out_of_stock_items': out_of_stock,
+        'total_users': stats['total_users'],
+        'total_orders': stats['total_orders'],
+        'total_revenue': round(float(stats['total_revenue']), 2),
+        'low_stock_items': stats['low_stock_items'],
+        'out_of_stock_items': stats['out_of_stock_items'],
         'recent_orders_7days': recent_orders
     })
 
 # ========== ADMIN REPORTS ENDPOINTS ==========
 
+sales_to_dict = row_mapper(['brand', 'model', 'orders_count', 'total_quantity', 'total_revenue'])
+stock_to_dict = row_mapper(['id', 'brand', 'model', 'stock_quantity', 'price'])
+
+STOCK_REPORT_QUERY = 'SELECT id, brand, model, stock_quantity, price FROM phones ORDER BY stock_quantity ASC'
+
 @app.route('/api/reports/sales', methods=['GET'])
 def get_sales_report():
     admin = require_admin()
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
+    # Optional inclusive date range: ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    start = request.args.get('start')
+    end = request.args.get('end')
+    try:
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    
+    conn = get_db()
     c = conn.cursor()
-    c.execute('''SELECT p.brand, p.model, COUNT(o.id) as orders_count, 
-                        SUM(o.quantity) as total_quantity, SUM(o.total_price) as total_revenue 
-                 FROM phones p LEFT JOIN orders o ON p.id = o.phone_id 
-                 GROUP BY p.id''')
-    
-    sales = []
-    for row in c.fetchall():
-        sales.append({
-            'brand': row[0],
-            'model': row[1],
-            'orders_count': row[2],
-            'total_quantity': row[3] or 0,
-            'total_revenue': float(row[4] or 0)
-        })
-    conn.close()
-    return jsonify({'sales': sales})
+    # Served from the trigger-maintained rollups instead of aggregating orders
+    if start or end:
+        c.execute('''SELECT p.brand, p.model, COALESCE(SUM(s.orders_count), 0) as orders_count, 
+                            COALESCE(SUM(s.total_quantity), 0) as total_quantity,
+                            ROUND(COALESCE(SUM(s.total_revenue), 0), 2) as total_revenue 
+                     FROM phones p LEFT JOIN sales_daily s 
+                          ON p.id = s.phone_id AND s.day >= ? AND s.day <= ? 
+                     GROUP BY p.id''', (start or '0000-00-00', end or '9999-99-99'))
+    else:
+        c.execute('''SELECT p.brand, p.model, COALESCE(s.orders_count, 0) as orders_count, 
+                            COALESCE(s.total_quantity, 0) as total_quantity,
+                            ROUND(COALESCE(s.total_revenue, 0), 2) as total_revenue 
+                     FROM phones p LEFT JOIN sales_totals s ON p.id = s.phone_id 
+                     ORDER BY p.id''')
+    
+    return jsonify({'sales': [sales_to_dict(row) for row in c.fetchall()]})
+
+@app.route('/api/reports/trends', methods=['GET'])
+def get_trends_report():
+    # Revenue, units and order counts per day/week/month, optionally split by brand and/or status:
+    # ?granularity=week&start=2024-01-01&end=2024-03-31&group_by=brand,status&brand=Apple&status=delivered
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    granularity = request.args.get('granularity', 'day')
+    group_by = tuple(field for field in request.args.get('group_by', '').split(',') if field)
+    start = request.args.get('start')
+    end = request.args.get('end')
+    try:
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    
+    rows = load_daily_buckets(get_db(), start, end,
+                              brands=request.args.getlist('brand'),
+                              statuses=request.args.getlist('status'))
+    try:
+        buckets = rebucket(rows, granularity, group_by)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'granularity': granularity,
+        'group_by': list(group_by),
+        'start': start,
+        'end': end,
+        'buckets': buckets
+    })
 
 @app.route('/api/reports/stock', methods=['GET'])
 def get_stock_report():
@@ -674,21 +1035,108 @@ def get_stock_report():
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT id, brand, model, stock_quantity, price FROM phones ORDER BY stock_quantity ASC")
-    
-    stock = []
-    for row in c.fetchall():
-        stock.append({
-            'id': row[0],
-            'brand': row[1],
-            'model': row[2],
-            'stock_quantity': row[3],
-            'price': row[4]
-        })
-    conn.close()
-    return jsonify({'stock': stock})
+    c.execute(STOCK_REPORT_QUERY)
+    
+    return jsonify({'stock': [stock_to_dict(row) for row in c.fetchall()]})
+
+# Full order listing columns, in output order
+ORDER_FIELDS = ['id', 'phone_id', 'customer_name', 'customer_email', 'customer_phone', 'quantity', 'total_price',
+                'status', 'house_number', 'street_address', 'delivery_city', 'delivery_state', 'delivery_zip',
+                'delivery_country', 'delivery_notes', 'created_at', 'brand', 'model', 'storage', 'color']
+
+ORDER_COLUMNS = ', '.join([f'o.{field}' for field in ORDER_FIELDS[:16]] + [f'p.{field}' for field in ORDER_FIELDS[16:]])
+
+ADMIN_USER_ORDERS_QUERY = f'''SELECT {ORDER_COLUMNS}
+                              FROM orders o 
+                              JOIN phones p ON o.phone_id = p.id 
+                              ORDER BY o.created_at DESC'''
+# Regular users see only their orders (by username/email) with the street address masked
+CUSTOMER_ORDERS_QUERY = '''SELECT o.id, o.phone_id, o.customer_name, o.customer_email, o.customer_phone, 
+                                  o.quantity, o.total_price, o.status, o.created_at,
+                                  p.brand, p.model, p.storage, p.color, '***', '***'
+                           FROM orders o 
+                           JOIN phones p ON o.phone_id = p.id 
+                           WHERE o.customer_name = ? OR o.customer_email = ?
+                           ORDER BY o.created_at DESC'''
+
+def orders_list_query(after_cursor=False, limited=False):
+    # Keyset order on (created_at, id), newest first; a cursor adds two parameters, a limit one
+    query = f'''SELECT {ORDER_COLUMNS}
+                FROM orders o 
+                JOIN phones p ON o.phone_id = p.id'''
+    if after_cursor:
+        query += ' WHERE (o.created_at, o.id) < (?, ?)'
+    query += ' ORDER BY o.created_at DESC, o.id DESC'
+    if limited:
+        query += ' LIMIT ?'
+    return query
+
+EXPORT_BATCH_SIZE = 1000
+
+order_to_dict = row_mapper(ORDER_FIELDS)
+
+def stream_order_rows(c, fmt):
+    # Pull rows from the open cursor in batches so memory stays flat however many orders exist
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ORDER_FIELDS)
+        # The header goes out on its own, so an export with no matching rows still has one
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    while True:
+        rows = c.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        if fmt == 'csv':
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            yield b''.join(dumps(order_to_dict(row)) + b'\n' for row in rows)
+
+def orders_export_response():
+    # ?format=json (default), ndjson or csv. json pages with limit/cursor (keyset on
+    # created_at, id); ndjson and csv stream every matching row, starting after cursor.
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'ndjson', 'csv'):
+        return jsonify({'error': 'Invalid format, expected one of: json, ndjson, csv'}), 400
+    
+    params = []
+    try:
+        limit = parse_page_size(request.args) if fmt == 'json' else None
+        cursor = request.args.get('cursor')
+        if cursor:
+            params.extend(decode_cursor(cursor, 2))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    if limit is not None:
+        params.append(limit + 1)
+    
+    conn = get_db()
+    c = conn.cursor()
+    c.execute(orders_list_query(after_cursor=bool(cursor), limited=limit is not None), params)
+    
+    if fmt == 'csv':
+        return app.response_class(stream_with_context(stream_order_rows(c, fmt)), mimetype='text/csv',
+                                  headers={'Content-Disposition': 'attachment; filename=orders.csv'})
+    if fmt == 'ndjson':
+        return app.response_class(stream_with_context(stream_order_rows(c, fmt)), mimetype='application/x-ndjson')
+    
+    rows = c.fetchall()
+    response = {}
+    if limit is not None:
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor([rows[-1][ORDER_FIELDS.index('created_at')], rows[-1][0]])
+        response['next_cursor'] = next_cursor
+    response['orders'] = [order_to_dict(row) for row in rows]
+    return jsonify(response)
 
 @app.route('/api/reports/orders', methods=['GET'])
 def get_orders_report():
@@ -696,39 +1144,7 @@ def get_orders_report():
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
-    c = conn.cursor()
-    c.execute('''SELECT o.*, p.brand, p.model, p.storage, p.color 
-                 FROM orders o 
-                 JOIN phones p ON o.phone_id = p.id 
-                 ORDER BY o.created_at DESC''')
-    
-    orders = []
-    for row in c.fetchall():
-        orders.append({
-            'id': row[0],
-            'phone_id': row[1],
-            'customer_name': row[2],
-            'customer_email': row[3],
-            'customer_phone': row[4],
-            'quantity': row[5],
-            'total_price': row[6],
-            'status': row[7],
-            'house_number': row[8],
-            'street_address': row[9],
-            'delivery_city': row[10],
-            'delivery_state': row[11],
-            'delivery_zip': row[12],
-            'delivery_country': row[13],
-            'delivery_notes': row[14],
-            'created_at': row[15],
-            'brand': row[16],
-            'model': row[17],
-            'storage': row[18],
-            'color': row[19]
-        })
-    conn.close()
-    return jsonify({'orders': orders})
+    return orders_export_response()
 
 # ========== ORDER STATUS MANAGEMENT ==========
 
@@ -748,7 +1164,7 @@ def update_order_status(order_id):
     if new_status not in valid_statuses:
         return jsonify({'error': 'Invalid status'}), 400
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     # Check if order exists
@@ -756,13 +1172,11 @@ def update_order_status(order_id):
     order = c.fetchone()
     
     if not order:
-        conn.close()
         return jsonify({'error': 'Order not found'}), 404
     
     # Update order status
     c.execute('UPDATE orders SET status = ? WHERE id = ?', (new_status, order_id))
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Order status updated successfully'})
 
@@ -772,7 +1186,7 @@ def delete_order(order_id):
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
     
     # Check if order exists
@@ -780,65 +1194,280 @@ def delete_order(order_id):
     order = c.fetchone()
     
     if not order:
-        conn.close()
         return jsonify({'error': 'Order not found'}), 404
     
     # Delete the order
     c.execute('DELETE FROM orders WHERE id = ?', (order_id,))
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Order deleted successfully'})
 
+# ========== CATALOG QUERIES ==========
+
+PHONE_FIELDS = ['id', 'brand', 'model', 'price', 'storage', 'color', 'stock_quantity', 'description', 'image_url']
+PHONE_COLUMNS = ', '.join(PHONE_FIELDS)
+
+# sort name -> (key column, direction); id is always the tie-breaker
+PHONE_SORTS = {
+    'newest': ('id', 'DESC'),
+    'price_low': ('price', 'ASC'),
+    'price_high': ('price', 'DESC'),
+    'name': ('model', 'ASC')
+}
+
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor')
+    return values
+
+def parse_page_size(args):
+    limit = args.get('limit')
+    if limit is None:
+        return None
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, MAX_PAGE_SIZE)
+
+def phone_filters(args):
+    conditions = []
+    params = []
+    
+    brands = [b for b in args.getlist('brand') if b]
+    if brands:
+        conditions.append(f"brand IN ({','.join('?' * len(brands))})")
+        params.extend(brands)
+    
+    if args.get('min_price'):
+        conditions.append('price >= ?')
+        params.append(float(args['min_price']))
+    if args.get('max_price'):
+        conditions.append('price <= ?')
+        params.append(float(args['max_price']))
+    
+    for field in ('storage', 'color'):
+        if args.get(field):
+            conditions.append(f'{field} = ?')
+            params.append(args[field])
+    
+    if args.get('in_stock', '').lower() in ('1', 'true', 'yes'):
+        conditions.append('stock_quantity > 0')
+    
+    return conditions, params
+
+phone_to_dict = row_mapper(PHONE_FIELDS)
+
+def phone_list_query(conditions, sort, after_cursor=False, limited=False):
+    # Filter conditions come from phone_filters; a cursor adds the keyset condition
+    # (one parameter for id, two otherwise) and a limit one more parameter
+    sort_column, direction = PHONE_SORTS[sort]
+    conditions = list(conditions)
+    if after_cursor:
+        if sort_column == 'id':
+            conditions.append('id < ?' if direction == 'DESC' else 'id > ?')
+        else:
+            conditions.append(f"({sort_column}, id) {'<' if direction == 'DESC' else '>'} (?, ?)")
+    query = f'SELECT {PHONE_COLUMNS} FROM phones'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    if sort_column == 'id':
+        query += f' ORDER BY id {direction}'
+    else:
+        query += f' ORDER BY {sort_column} {direction}, id {direction}'
+    if limited:
+        query += ' LIMIT ?'
+    return query
+
+def load_catalog_version():
+    # (version, updated_at): the counter identifies the catalog, the time becomes Last-Modified
+    row = get_db().execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
+    return (row[0], row[1] or 0) if row else (0, 0)
+
+def catalog_cached(view):
+    # Serve the serialized JSON from catalog_cache with a strong ETag and Last-Modified;
+    # answer If-None-Match / If-Modified-Since with 304. Only successful responses are cached.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        catalog = catalog_cache.version(load_catalog_version)
+        version, updated_at = catalog
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = catalog_cache.get(key, catalog)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+            entry = catalog_cache.set(key, catalog, response.get_data(), f'v{version}-{digest}')
+        
+        body, etag = entry
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(updated_at, timezone.utc)
+        response.headers['Cache-Control'] = 'public, no-cache'
+        response.make_conditional(request)
+        if response.status_code == 304:
+            catalog_cache.record_not_modified()
+        return response
+    return wrapper
+
 # ========== PUBLIC ENDPOINTS ==========
 
 @app.route('/api/phones', methods=['GET'])
+@catalog_cached
 def get_phones():
+    # Optional filters: brand (repeatable), min_price, max_price, storage, color, in_stock.
+    # Pass limit (and then cursor=next_cursor) to page through results by keyset.
+    sort = request.args.get('sort', 'newest')
+    if sort not in PHONE_SORTS:
+        return jsonify({'error': f'Invalid sort, expected one of: {", ".join(PHONE_SORTS)}'}), 400
+    sort_column, direction = PHONE_SORTS[sort]
+    
+    try:
+        conditions, params = phone_filters(request.args)
+        limit = parse_page_size(request.args)
+        cursor = request.args.get('cursor')
+        if cursor:
+            params.extend(decode_cursor(cursor, 1 if sort_column == 'id' else 2))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
+    query = phone_list_query(conditions, sort, after_cursor=bool(cursor), limited=limit is not None)
+    
     try:
-        conn = sqlite3.connect('phone_store.db')
+        conn = get_db()
         c = conn.cursor()
-        c.execute("SELECT * FROM phones ORDER BY id DESC")
-        phones = []
-        for row in c.fetchall():
-            phones.append({
-                'id': row[0],
-                'brand': row[1],
-                'model': row[2],
-                'price': row[3],
-                'storage': row[4],
-                'color': row[5],
-                'stock_quantity': row[6],
-                'description': row[7],
-                'image_url': row[8]
-            })
-        conn.close()
-        return jsonify({'phones': phones})
+        c.execute(query, params)
+        rows = c.fetchall()
     except Exception as e:
         return jsonify({'error': f'Failed to load phones: {str(e)}'}), 500
+    
+    response = {}
+    if limit is not None:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = phone_to_dict(rows[-1])
+            keys = [last['id']] if sort_column == 'id' else [last[sort_column], last['id']]
+            next_cursor = encode_cursor(keys)
+        response['next_cursor'] = next_cursor
+    response['phones'] = [phone_to_dict(row) for row in rows]
+    return jsonify(response)
+
+# Column weights for bm25: brand, model, description, color, storage
+SEARCH_WEIGHTS = '10.0, 10.0, 1.0, 2.0, 2.0'
+
+def search_match_expression(text):
+    # Quote every word and make it a prefix term, so user input can never be
+    # parsed as FTS5 syntax and partial words match while typing
+    terms = re.findall(r'\w+', text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_query(conditions, after_cursor=False):
+    # Parameters: the MATCH expression, the filter values, two for a cursor, then the limit
+    conditions = list(conditions)
+    if after_cursor:
+        conditions.append('(s.score, s.phone_id) > (?, ?)')
+    query = f'''SELECT {PHONE_COLUMNS}, s.score
+                FROM (SELECT rowid AS phone_id, bm25(phones_fts, {SEARCH_WEIGHTS}) AS score
+                      FROM phones_fts WHERE phones_fts MATCH ?) s
+                JOIN phones ON phones.id = s.phone_id'''
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    return query + ' ORDER BY s.score, s.phone_id LIMIT ?'
+
+@app.route('/api/phones/search', methods=['GET'])
+@catalog_cached
+def search_phones():
+    # ?q=<text> plus the /api/phones filters; results are ranked by relevance
+    # and paged with limit (default 20) and cursor=next_cursor.
+    match = search_match_expression(request.args.get('q', ''))
+    if not match:
+        return jsonify({'error': 'Search query "q" is required'}), 400
+    
+    try:
+        conditions, params = phone_filters(request.args)
+        limit = parse_page_size(request.args) or 20
+        cursor = request.args.get('cursor')
+        if cursor:
+            params.extend(decode_cursor(cursor, 2))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {str(e)}'}), 400
+    
+    try:
+        c = get_db().cursor()
+        c.execute(search_query(conditions, after_cursor=bool(cursor)), [match] + params + [limit + 1])
+        rows = c.fetchall()
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][-1], rows[-1][0]])
+    
+    return jsonify({
+        'phones': [phone_to_dict(row) for row in rows],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/api/phones/<int:phone_id>', methods=['GET'])
+@catalog_cached
 def get_phone(phone_id):
-    conn = sqlite3.connect('phone_store.db')
+    conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT * FROM phones WHERE id=?", (phone_id,))
+    c.execute(f"SELECT {PHONE_COLUMNS} FROM phones WHERE id=?", (phone_id,))
     phone = c.fetchone()
-    conn.close()
     
     if phone:
-        return jsonify({
-            'id': phone[0],
-            'brand': phone[1],
-            'model': phone[2],
-            'price': phone[3],
-            'storage': phone[4],
-            'color': phone[5],
-            'stock_quantity': phone[6],
-            'description': phone[7],
-            'image_url': phone[8]
-        })
+        return jsonify(phone_to_dict(phone))
     return jsonify({'error': 'Phone not found'}), 404
 
+class OrderRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def reserve_stock(c, phone_id, quantity):
+    # Conditional decrement: succeeds only if enough stock remains, so two
+    # concurrent checkouts can never both take the last units.
+    c.execute('''UPDATE phones SET stock_quantity = stock_quantity - ?
+                 WHERE id = ? AND stock_quantity >= ?''', (quantity, phone_id, quantity))
+    reserved = c.rowcount == 1
+    
+    c.execute('SELECT price FROM phones WHERE id = ?', (phone_id,))
+    phone = c.fetchone()
+    if not phone:
+        raise OrderRejected('Phone not found', 404)
+    if not reserved:
+        raise OrderRejected('Insufficient stock')
+    return phone[0]
+
+def place_order(c, data, quantity):
+    price = reserve_stock(c, data['phone_id'], quantity)
+    c.execute('''INSERT INTO orders 
+                (phone_id, customer_name, customer_email, customer_phone, quantity, total_price,
+                 house_number, street_address, delivery_city, delivery_state, delivery_zip, delivery_country, delivery_notes) 
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+              (data['phone_id'], data['customer_name'], data['customer_email'], data['customer_phone'], 
+               quantity, price * quantity, data['house_number'], data['street_address'], data['delivery_city'], 
+               data['delivery_state'], data['delivery_zip'], data['delivery_country'], data.get('delivery_notes', '')))
+    return c.lastrowid
+
 @app.route('/api/orders', methods=['POST'])
+@rate_limited('orders', user_key=order_user_key)
 def add_order():
     user = authenticate_user()
     if not user:
@@ -853,39 +1482,109 @@ def add_order():
         if not data.get(field):
             return jsonify({'error': f'Field "{field}" is required'}), 400
     
-    conn = sqlite3.connect('phone_store.db')
-    c = conn.cursor()
-    
-    c.execute("SELECT price, stock_quantity FROM phones WHERE id=?", (data['phone_id'],))
-    phone = c.fetchone()
-    if not phone:
-        return jsonify({'error': 'Phone not found'}), 404
+    try:
+        quantity = int(data['quantity'])
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid quantity format'}), 400
+    if quantity < 1:
+        return jsonify({'error': 'Quantity must be at least 1'}), 400
     
-    price, stock = phone
-    quantity = data['quantity']
+    try:
+        order_id = run_write(lambda c: place_order(c, data, quantity))
+    except OrderRejected as e:
+        return jsonify({'error': e.message}), e.status
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 503 if is_busy_error(e) else 500
+    catalog_cache.invalidate()
     
-    if stock < quantity:
-        return jsonify({'error': 'Insufficient stock'}), 400
+    return jsonify({
+        'message': 'Order placed successfully',
+        'order_id': order_id
+    }), 201
+
+MAX_BATCH_ITEMS = 100
+
+ORDER_DETAIL_FIELDS = ['customer_name', 'customer_email', 'customer_phone', 'house_number', 'street_address',
+                       'delivery_city', 'delivery_state', 'delivery_zip', 'delivery_country']
+
+def place_batch_order(c, data, items):
+    # Total quantity per phone, so a phone listed twice is checked against its stock once
+    wanted = {}
+    for phone_id, quantity in items:
+        wanted[phone_id] = wanted.get(phone_id, 0) + quantity
+    phone_ids = list(wanted)
+    
+    # BEGIN IMMEDIATE holds the write lock, so this check cannot go stale before the decrement
+    c.execute(f"SELECT id, price, stock_quantity FROM phones WHERE id IN ({','.join('?' * len(phone_ids))})",
+              phone_ids)
+    phones = {row[0]: (row[1], row[2]) for row in c.fetchall()}
+    
+    missing = [phone_id for phone_id in phone_ids if phone_id not in phones]
+    if missing:
+        raise OrderRejected(f"Phone not found: {', '.join(map(str, missing))}", 404)
+    short = [phone_id for phone_id in phone_ids if phones[phone_id][1] < wanted[phone_id]]
+    if short:
+        raise OrderRejected(f"Insufficient stock for phone: {', '.join(map(str, short))}")
+    
+    c.executemany('UPDATE phones SET stock_quantity = stock_quantity - ? WHERE id = ?',
+                  [(wanted[phone_id], phone_id) for phone_id in phone_ids])
+    
+    order_ids = []
+    for phone_id, quantity in items:
+        c.execute('''INSERT INTO orders 
+                    (phone_id, customer_name, customer_email, customer_phone, quantity, total_price,
+                     house_number, street_address, delivery_city, delivery_state, delivery_zip, delivery_country, delivery_notes) 
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                  (phone_id, data['customer_name'], data['customer_email'], data['customer_phone'],
+                   quantity, phones[phone_id][0] * quantity, data['house_number'], data['street_address'],
+                   data['delivery_city'], data['delivery_state'], data['delivery_zip'], data['delivery_country'],
+                   data.get('delivery_notes', '')))
+        order_ids.append(c.lastrowid)
+    return order_ids
+
+@app.route('/api/orders/batch', methods=['POST'])
+@rate_limited('orders', user_key=order_user_key)
+def add_orders_batch():
+    # One request, one stock check and one commit for a whole cart:
+    # {"items": [{"phone_id": 1, "quantity": 2}, ...], "customer_name": ..., <delivery fields>}
+    user = authenticate_user()
+    if not user:
+        return jsonify({'error': 'Please login to place orders'}), 401
     
-    total_price = price * quantity
+    data = request.json
     
-    c.execute('''INSERT INTO orders 
-                (phone_id, customer_name, customer_email, customer_phone, quantity, total_price,
-                 house_number, street_address, delivery_city, delivery_state, delivery_zip, delivery_country, delivery_notes) 
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-              (data['phone_id'], data['customer_name'], data['customer_email'], data['customer_phone'], 
-               quantity, total_price, data['house_number'], data['street_address'], data['delivery_city'], 
-               data['delivery_state'], data['delivery_zip'], data['delivery_country'], data.get('delivery_notes', '')))
+    for field in ORDER_DETAIL_FIELDS:
+        if not data.get(field):
+            return jsonify({'error': f'Field "{field}" is required'}), 400
     
-    c.execute("UPDATE phones SET stock_quantity = stock_quantity - ? WHERE id = ?", (quantity, data['phone_id']))
+    raw_items = data.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({'error': 'Field "items" must be a non-empty list'}), 400
+    if len(raw_items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per order'}), 400
+    
+    items = []
+    for index, item in enumerate(raw_items):
+        try:
+            phone_id = int(item['phone_id'])
+            quantity = int(item['quantity'])
+        except (KeyError, ValueError, TypeError):
+            return jsonify({'error': f'Item {index}: phone_id and quantity must be integers'}), 400
+        if quantity < 1:
+            return jsonify({'error': f'Item {index}: quantity must be at least 1'}), 400
+        items.append((phone_id, quantity))
     
-    order_id = c.lastrowid
-    conn.commit()
-    conn.close()
+    try:
+        order_ids = run_write(lambda c: place_batch_order(c, data, items))
+    except OrderRejected as e:
+        return jsonify({'error': e.message}), e.status
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 503 if is_busy_error(e) else 500
+    catalog_cache.invalidate()
     
     return jsonify({
-        'message': 'Order placed successfully',
-        'order_id': order_id
+        'message': 'Orders placed successfully',
+        'order_ids': order_ids
     }), 201
 
 @app.route('/api/orders', methods=['GET'])
@@ -894,39 +1593,7 @@ def get_orders():
     if isinstance(admin, tuple):
         return admin
     
-    conn = sqlite3.connect('phone_store.db')
-    c = conn.cursor()
-    c.execute('''SELECT o.*, p.brand, p.model, p.storage, p.color 
-                 FROM orders o 
-                 JOIN phones p ON o.phone_id = p.id 
-                 ORDER BY o.created_at DESC''')
-    
-    orders = []
-    for row in c.fetchall():
-        orders.append({
-            'id': row[0],
-            'phone_id': row[1],
-            'customer_name': row[2],
-            'customer_email': row[3],
-            'customer_phone': row[4],
-            'quantity': row[5],
-            'total_price': row[6],
-            'status': row[7],
-            'house_number': row[8],
-            'street_address': row[9],
-            'delivery_city': row[10],
-            'delivery_state': row[11],
-            'delivery_zip': row[12],
-            'delivery_country': row[13],
-            'delivery_notes': row[14],
-            'created_at': row[15],
-            'brand': row[16],
-            'model': row[17],
-            'storage': row[18],
-            'color': row[19]
-        })
-    conn.close()
-    return jsonify({'orders': orders})
+    return orders_export_response()
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
@@ -936,8 +1603,13 @@ def health_check():
 # Database check endpoint
 @app.route('/api/db-check', methods=['GET'])
 def db_check():
+    # Admin only: the report includes file paths and the SQL text of recent slow queries
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
     try:
-        conn = sqlite3.connect('phone_store.db')
+        conn = get_db()
         c = conn.cursor()
         
         c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='phones'")
@@ -949,35 +1621,64 @@ def db_check():
         else:
             phone_count = 0
             
-        conn.close()
         
         return jsonify({
             'phones_table_exists': phones_table_exists,
             'phone_count': phone_count,
-            'database_file': 'phone_store.db',
-            'file_exists': os.path.exists('phone_store.db')
+            'database_file': app.config['DATABASE'],
+            'file_exists': os.path.exists(app.config['DATABASE']),
+            'pool': db_pool.stats(),
+            'session_cache': session_cache.stats(),
+            'catalog_cache': catalog_cache.stats(),
+            'jobs': {name: job.stats() for name, job in background_jobs.items()},
+            'session_reaper': session_reaper_stats,
+            'auth_token_mode': app.config['AUTH_TOKEN_MODE'],
+            'revocations': revocations.stats(),
+            'password_hasher': password_hasher.stats(),
+            'rate_limits': dict(rate_limiter.stats(), trusted_proxies=app.config['TRUSTED_PROXY_COUNT']),
+            'write_queue': dict(write_queue.stats(), enabled=app.config['WRITE_QUEUE_ENABLED']),
+            'compression': compressor.stats(),
+            'conditional_requests': conditional_stats,
+            'slow_queries': {'total': query_recorder.slow_total,
+                             'threshold_ms': app.config['SLOW_QUERY_THRESHOLD_MS'],
+                             'recent': list(query_recorder.slow_queries)}
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
-    print("🚀 Starting PhoneTech Server...")
-    print("📊 Initializing database...")
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text format. Each server.py worker keeps its own numbers, so
+    # scrape every worker or aggregate by instance.
+    token = app.config['METRICS_TOKEN']
+    if not token and not app.debug:
+        return jsonify({'error': 'Metrics are disabled, set METRICS_TOKEN to enable them'}), 403
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Authentication required'}), 401
     
-    try:
-        init_db()
-        print("\n✅ PhoneTech Server running on http://localhost:5000")
-        print("📱 Frontend: Open index.html in your browser")
-        print("🔑 Admin Login: username='admin', password='admin123'")
-        print("👤 User Login: username='user', password='user123'")
-        print("🔧 Health Check: http://localhost:5000/api/health")
-        print("📊 DB Check: http://localhost:5000/api/db-check")
-        print("===============================================\n")
-        app.run(debug=True, port=5000)
-    except Exception as e:
-        print(f"❌ Failed to start server: {str(e)}")
-        
-        # ------------------------------
+    pool = db_pool.stats()
+    sessions = session_cache.stats()
+    catalog = catalog_cache.stats()
+    compression = compressor.stats()
+    extra = [
+        ('db_pool_open_connections', 'gauge', 'Open SQLite connections in the pool.', pool['open_connections']),
+        ('db_pool_waits_total', 'counter', 'Requests that waited for a pooled connection.', pool['waits']),
+        ('db_pool_timeouts_total', 'counter', 'Requests that timed out waiting for a connection.', pool['timeouts']),
+        ('slow_queries_total', 'counter', 'SQL statements slower than the slow-query threshold.',
+         query_recorder.slow_total),
+        ('session_cache_hits_total', 'counter', 'Session cache hits.', sessions['hits']),
+        ('session_cache_misses_total', 'counter', 'Session cache misses.', sessions['misses']),
+        ('catalog_cache_hits_total', 'counter', 'Catalog response cache hits.', catalog['hits']),
+        ('catalog_cache_misses_total', 'counter', 'Catalog response cache misses.', catalog['misses']),
+        ('not_modified_total', 'counter', '304 Not Modified responses.', conditional_stats['not_modified']),
+        ('compression_bytes_saved_total', 'counter', 'Bytes saved by response compression.',
+         compression['bytes_saved']),
+        ('password_hash_rejected_total', 'counter', 'Logins refused because the hashing pool was full.',
+         password_hasher.stats()['rejected'])
+    ]
+    return app.response_class(request_metrics.render(extra), mimetype='text/plain; version=0.0.4')
+
+# ------------------------------
 # UPDATE ORDER STATUS (ADMIN ONLY)
 # ------------------------------
 @app.route('/api/orders/<int:order_id>', methods=['PUT'])
@@ -987,18 +1688,14 @@ def update_order(order_id):
     if not session_token:
         return jsonify({"error": "Missing Authorization token"}), 401
 
-    # Verify session belongs to an admin
-    cursor.execute("""
-        SELECT users.is_admin
-        FROM sessions
-        JOIN users ON sessions.user_id = users.id
-        WHERE sessions.session_token = ?
-    """, (session_token,))
-    session_data = cursor.fetchone()
-
-    if not session_data or session_data[0] == 0:
+    # Verify session belongs to an admin (database session or signed token)
+    user = authenticate_user()
+    if not user or not user['is_admin']:
         return jsonify({"error": "Admin access required"}), 403
 
+    conn = get_db()
+    cursor = conn.cursor()
+
     # Get new status from JSON
     data = request.json
     new_status = data.get('status')
@@ -1010,4 +1707,128 @@ def update_order(order_id):
     cursor.execute("UPDATE orders SET status = ? WHERE id = ?", (new_status, order_id))
     conn.commit()
 
-    return jsonify({"message": "Order updated successfully", "order_id": order_id, "status": new_status})
\ No newline at end of file
+    return jsonify({"message": "Order updated successfully", "order_id": order_id, "status": new_status})
+
+# ========== DATABASE MAINTENANCE COMMANDS ==========
+
+# Hot route queries that must stay on an index. Run `flask --app app check-query-plans`
+# after schema or query changes; it exits non-zero if any of them falls back to a full scan.
+QUERY_PLAN_CHECKS = [
+    ('authenticate_user', AUTH_SESSION_QUERY, ('token',)),
+    ('login: clear sessions', CLEAR_USER_SESSIONS_SQL, (1,)),
+    ('get_user_orders: admin', ADMIN_USER_ORDERS_QUERY, ()),
+    ('get_user_orders: customer', CUSTOMER_ORDERS_QUERY, ('user', 'user')),
+    ('get_orders: first page', orders_list_query(limited=True), (21,)),
+    ('get_orders: next page', orders_list_query(after_cursor=True, limited=True), ('2024-01-01 00:00:00', 1, 21)),
+    ('get_admin_stats: counters', DASHBOARD_STATS_QUERY, ()),
+    ('get_admin_stats: recent orders', RECENT_ORDERS_QUERY, ()),
+    ('get_stock_report', STOCK_REPORT_QUERY, ()),
+    ('get_phones: brand + price sort', phone_list_query(['brand IN (?)'], 'price_low', after_cursor=True, limited=True),
+     ('Apple', 0, 0, 21)),
+    ('get_phones: price sort', phone_list_query([], 'price_high', after_cursor=True, limited=True), (1e9, 0, 21)),
+    ('get_phones: name sort', phone_list_query([], 'name', limited=True), (21,)),
+    ('get_phones: newest', phone_list_query([], 'newest', after_cursor=True, limited=True), (1000, 21)),
+    ('search_phones', search_query([], after_cursor=True), ('"phone"*', 0, 0, 21)),
+]
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    conn = sqlite3.connect(app.config['DATABASE'])
+    failures = 0
+    try:
+        migrate(conn)
+        for name, sql, params in QUERY_PLAN_CHECKS:
+            scans = full_table_scans(conn, sql, params)
+            if scans:
+                failures += 1
+                print(f"❌ {name}: {'; '.join(scans)}")
+            else:
+                print(f"✅ {name}")
+    finally:
+        conn.close()
+    if failures:
+        raise SystemExit(1)
+
+@app.cli.command('import-phones')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows per transaction.')
+def import_phones_command(path, fmt, chunk_size):
+    fmt = fmt or detect_format(None, path)
+    conn = sqlite3.connect(app.config['DATABASE'])
+    apply_pragmas(conn, app.config['DB_PRAGMAS'], skip=('journal_mode',))
+    started = time.perf_counter()
+    try:
+        migrate(conn)
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            report = import_phones(conn, read_rows(stream, fmt), chunk_size=chunk_size,
+                                   retries=app.config['DB_WRITE_RETRIES'])
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+    
+    print(f"✅ Imported {report['imported']} of {report['processed']} rows in {elapsed:.2f}s "
+          f"({report['processed'] / max(elapsed, 1e-9):.0f} rows/s)")
+    for error in report['errors']:
+        print(f"❌ line {error['line']}: {error['error']}")
+    if report['error_count'] > len(report['errors']):
+        print(f"... and {report['error_count'] - len(report['errors'])} more errors")
+    if report['error_count']:
+        raise SystemExit(1)
+
+@app.cli.command('reconcile-stats')
+def reconcile_stats_command():
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        migrate(conn)
+        drifted = reconcile_dashboard_stats(conn)
+        print(f"✅ Dashboard stats reconciled ({', '.join(drifted) if drifted else 'no drift'})")
+        rebuild_sales_rollup(conn)
+        print("✅ Sales rollup rebuilt")
+        rebuild_order_buckets(conn)
+        print("✅ Order trend buckets rebuilt")
+    finally:
+        conn.close()
+
+@app.cli.command('reap-sessions')
+@click.option('--batch-size', default=500, show_default=True, help='Rows deleted per transaction.')
+def reap_sessions_command(batch_size):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    apply_pragmas(conn, app.config['DB_PRAGMAS'], skip=('journal_mode',))
+    try:
+        migrate(conn)
+        reaped = reap_expired_sessions(conn, batch_size=batch_size)
+        print(f"✅ Removed {reaped} expired sessions")
+    finally:
+        conn.close()
+
+@app.cli.command('rebuild-indexes')
+def rebuild_indexes_command():
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        migrate(conn)
+        rebuild_indexes(conn)
+        print("✅ Indexes rebuilt and statistics refreshed")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    print("🚀 Starting PhoneTech Server...")
+    print("📊 Initializing database...")
+    
+    try:
+        init_db()
+        # The debug reloader runs this block in a watcher process too; only the serving child needs jobs
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_background_jobs()
+        print("\n✅ PhoneTech Server running on http://localhost:5000")
+        print("📱 Frontend: Open index.html in your browser")
+        print("🔑 Admin Login: username='admin', password='admin123'")
+        print("👤 User Login: username='user', password='user123'")
+        print("🔧 Health Check: http://localhost:5000/api/health")
+        print("📊 DB Check (admin): http://localhost:5000/api/db-check")
+        print("🏭 Production: python server.py --workers 4 --threads 8")
+        print("===============================================\n")
+        app.run(debug=True, port=5000)
+    except Exception as e:
+        print(f"❌ Failed to start server: {str(e)}")
@@ -0,0 +1,426 @@
+"""Async (ASGI) serving mode for the phone store API.
+
+One process runs an event loop that owns every client connection, so an
+idle keep-alive client costs a socket and no thread. Requests to the
+read-heavy endpoints (the catalog, /api/user and the reports) run on a
+dedicated executor of database threads; every other route runs on a
+separate executor, so slow logins, imports and checkouts can never take
+the readers' threads. Both executors call the unchanged Flask app, so
+responses, caching, compression and metrics are exactly those of the
+WSGI server.
+
+    python asgi.py --bind 0.0.0.0:8000 --read-threads 8 --threads 8
+    uvicorn asgi:app --port 8000
+
+python asgi.py serves with uvicorn when it is installed and otherwise with
+a small built-in HTTP/1.1 server.
+"""
+import argparse
+import asyncio
+import contextvars
+import functools
+import io
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from werkzeug.exceptions import HTTPException
+
+import app as phone_store
+from server import parse_bind
+
+try:
+    import uvicorn
+except ImportError:  # uvicorn is optional; the built-in server is used without it
+    uvicorn = None
+
+READ_ENDPOINTS = {'get_phones', 'search_phones', 'get_phone', 'get_current_user'} | {
+    rule.endpoint for rule in phone_store.app.url_map.iter_rules() if rule.rule.startswith('/api/reports/')}
+
+_DONE = object()
+
+
+# ========== ASGI APPLICATION ==========
+
+class AsyncPhoneStore:
+    """ASGI application running the Flask app's views on two thread pools."""
+
+    def __init__(self, flask_app, read_threads=8, threads=8):
+        self.flask_app = flask_app
+        self.read_threads = read_threads
+        self.threads = threads
+        self.read_executor = None
+        self.executor = None
+        self.routes = flask_app.url_map.bind('localhost')
+
+    def startup(self, run_jobs=True):
+        self.read_executor = ThreadPoolExecutor(max_workers=self.read_threads, thread_name_prefix='db-read')
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='http')
+        phone_store.init_worker(run_jobs=run_jobs)
+
+    def shutdown(self):
+        for executor in (self.read_executor, self.executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        phone_store.shutdown_worker()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.executor is None:
+                    # Run under an ASGI server such as uvicorn: set the database up here
+                    await loop.run_in_executor(None, phone_store.init_db)
+                    self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await loop.run_in_executor(None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def executor_for(self, method, path):
+        if method in ('GET', 'HEAD'):
+            try:
+                endpoint, _ = self.routes.match(path, method)
+            except HTTPException:
+                return self.executor
+            if endpoint in READ_ENDPOINTS:
+                return self.read_executor
+        return self.executor
+
+    async def handle(self, scope, receive, send):
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        loop = asyncio.get_running_loop()
+        executor = self.executor_for(scope['method'], scope['path'])
+        # Every step of one request runs in the same context, wherever the executor runs it:
+        # stream_with_context keeps the Flask request context in context variables
+        context = contextvars.copy_context()
+        status, headers, chunks, rest = await loop.run_in_executor(
+            executor, context.run, self.call_flask, wsgi_environ(scope, b''.join(body)))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if rest is None:
+            await send({'type': 'http.response.body', 'body': chunks})
+            return
+        # A streamed response (the order exports) keeps reading the database between chunks
+        try:
+            await send({'type': 'http.response.body', 'body': chunks, 'more_body': True})
+            while True:
+                chunk = await loop.run_in_executor(executor, context.run, next, rest, _DONE)
+                if chunk is _DONE:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(rest, 'close'):
+                await loop.run_in_executor(executor, context.run, rest.close)
+
+    def call_flask(self, environ):
+        # Returns (status, headers, body, None), or (status, headers, first chunk, iterator) when streamed
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers]
+
+        iterable = self.flask_app(environ, start_response)
+        iterator = iter(iterable)
+        first = next(iterator, b'')
+        if any(name == b'content-length' for name, _ in started['headers']):
+            body = first + b''.join(iterator)
+            if hasattr(iterable, 'close'):
+                iterable.close()
+            return started['status'], started['headers'], body, None
+        return started['status'], started['headers'], first, _closing(iterable, iterator)
+
+
+class _closing:
+    """Iterator over a WSGI body that closes the original iterable when done."""
+
+    def __init__(self, iterable, iterator):
+        self.iterable = iterable
+        self.iterator = iterator
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.iterator)
+
+    def close(self):
+        if hasattr(self.iterable, 'close'):
+            self.iterable.close()
+
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+app = AsyncPhoneStore(phone_store.app,
+                      read_threads=int(os.environ.get('ASYNC_READ_THREADS', phone_store.app.config['DB_POOL_SIZE'])),
+                      threads=int(os.environ.get('ASYNC_THREADS', 8)))
+
+
+# ========== BUILT-IN HTTP SERVER ==========
+
+class HTTPServer:
+    """Minimal asyncio HTTP/1.1 server for an ASGI app: keep-alive, Content-Length or chunked responses.
+
+    Request bodies must come with Content-Length and are buffered in full, so
+    anything over ``max_body_size`` bytes is refused with 413. Idle connections are closed
+    after ``keepalive`` seconds; on shutdown, idle connections are closed at
+    once and requests in progress get ``graceful_timeout`` seconds to finish.
+    """
+
+    def __init__(self, asgi_app, keepalive=75.0, graceful_timeout=30.0, max_header_size=65536,
+                 max_body_size=32 * 1024 * 1024):
+        self.asgi_app = asgi_app
+        self.keepalive = keepalive
+        self.graceful_timeout = graceful_timeout
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.connections = {}  # task -> True while a request is in progress
+        self.stopping = asyncio.Event()
+
+    async def serve(self, host, port, backlog):
+        server = await asyncio.start_server(self.connection, host, port, backlog=backlog,
+                                            limit=self.max_header_size)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stopping.set)
+        async with server:
+            await self.stopping.wait()
+            server.close()
+            for task, busy in list(self.connections.items()):
+                if not busy:
+                    task.cancel()
+            busy = [task for task in self.connections]
+            if busy:
+                await asyncio.wait(busy, timeout=self.graceful_timeout)
+            for task in list(self.connections):
+                task.cancel()
+
+    async def connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections[task] = False
+        try:
+            while not self.stopping.is_set():
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.error(writer, 431)
+                    break
+                self.connections[task] = True
+                keep_alive = await self.request(head, reader, writer)
+                self.connections[task] = False
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.pop(task, None)
+            writer.close()
+
+    async def request(self, head, reader, writer):
+        try:
+            request_line, *lines = head[:-4].decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+            headers = []
+            for line in lines:
+                name, value = line.split(':', 1)
+                headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+            fields = {name: value for name, value in headers}
+            length = int(fields.get(b'content-length', b'0'))
+            if length < 0:
+                raise ValueError('negative Content-Length')
+        except ValueError:
+            await self.error(writer, 400)
+            return False
+        if b'transfer-encoding' in fields:
+            await self.error(writer, 411)
+            return False
+        if length > self.max_body_size:
+            await self.error(writer, 413)
+            return False
+        body = await reader.readexactly(length) if length else b''
+
+        connection = fields.get(b'connection', b'').lower()
+        keep_alive = connection != b'close' if version == 'HTTP/1.1' else connection == b'keep-alive'
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0', 'spec_version': '2.3'},
+            'http_version': version[5:],
+            'method': method.upper(),
+            'scheme': 'http',
+            'path': unquote(path),
+            'raw_path': path.encode('latin-1'),
+            'query_string': query.encode('latin-1'),
+            'root_path': '',
+            'headers': headers,
+            'client': writer.get_extra_info('peername')[:2],
+            'server': writer.get_extra_info('sockname')[:2]
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Nothing more will arrive for this request
+                await self.stopping.wait()
+                return {'type': 'http.disconnect'}
+            received = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        response = {'chunked': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = list(message.get('headers', []))
+                return
+            data = message.get('body', b'')
+            more = message.get('more_body', False)
+            if 'sent' not in response:
+                response['sent'] = True
+                headers = response['headers']
+                if not any(name == b'content-length' for name, _ in headers):
+                    if more:
+                        response['chunked'] = True
+                        headers.append((b'transfer-encoding', b'chunked'))
+                    else:
+                        headers.append((b'content-length', str(len(data)).encode()))
+                if not keep_alive:
+                    headers.append((b'connection', b'close'))
+                writer.write(status_line(version, response['status']) +
+                             b''.join(name + b': ' + value + b'\r\n' for name, value in headers) + b'\r\n')
+            if method.upper() == 'HEAD':
+                data = b''
+            if response['chunked']:
+                if data:
+                    writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                if not more:
+                    writer.write(b'0\r\n\r\n')
+            elif data:
+                writer.write(data)
+            await writer.drain()
+
+        try:
+            await self.asgi_app(scope, receive, send)
+        except Exception as e:
+            print(f"❌ Unhandled error for {method} {target}: {e!r}", file=sys.stderr)
+            if 'sent' not in response:
+                await self.error(writer, 500)
+            return False
+        return keep_alive
+
+    async def error(self, writer, status):
+        writer.write(status_line('HTTP/1.1', status) + b'content-length: 0\r\nconnection: close\r\n\r\n')
+        await writer.drain()
+
+
+@functools.lru_cache(maxsize=None)
+def status_line(version, status):
+    try:
+        phrase = HTTPStatus(status).phrase
+    except ValueError:
+        phrase = ''
+    return f'{version} {status} {phrase}\r\n'.encode('latin-1')
+
+
+async def serve_builtin(args):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, phone_store.init_db)
+    app.startup()
+    try:
+        await HTTPServer(app, keepalive=args.keepalive, graceful_timeout=args.graceful_timeout,
+                         max_body_size=args.max_body_size).serve(*parse_bind(args.bind), backlog=args.backlog)
+    finally:
+        await loop.run_in_executor(None, app.shutdown)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the phone store API from an asyncio event loop.')
+    parser.add_argument('--bind', default=os.environ.get('SERVER_BIND', '127.0.0.1:5000'), help='host:port')
+    parser.add_argument('--read-threads', type=int, default=app.read_threads,
+                        help='threads for the catalog, /api/user and report endpoints')
+    parser.add_argument('--threads', type=int, default=app.threads, help='threads for all other endpoints')
+    parser.add_argument('--keepalive', type=float, default=float(os.environ.get('SERVER_KEEPALIVE', 75)),
+                        help='seconds an idle keep-alive connection is kept open')
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=float(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--max-body-size', type=int,
+                        default=int(os.environ.get('SERVER_MAX_BODY_SIZE', 32 * 1024 * 1024)),
+                        help='largest request body in bytes the built-in server accepts (larger gets 413)')
+    parser.add_argument('--server', choices=['auto', 'builtin', 'uvicorn'], default='auto')
+    args = parser.parse_args(argv)
+
+    app.read_threads = args.read_threads
+    app.threads = args.threads
+    use_uvicorn = args.server == 'uvicorn' or (args.server == 'auto' and uvicorn is not None)
+    if use_uvicorn and uvicorn is None:
+        parser.error('uvicorn is not installed')
+
+    print("🚀 Starting PhoneTech Server (async)...")
+    host, port = parse_bind(args.bind)
+    print(f"✅ Listening on http://{args.bind} with {args.read_threads} read threads + {args.threads} threads "
+          f"({'uvicorn' if use_uvicorn else 'built-in server'})")
+    if use_uvicorn:
+        uvicorn.run(app, host=host, port=port, backlog=args.backlog, timeout_keep_alive=int(args.keepalive),
+                    timeout_graceful_shutdown=int(args.graceful_timeout), lifespan='on')
+    else:
+        asyncio.run(serve_builtin(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Write throughput of per-request commits versus the group-commit write queue.
+
+Places orders through POST /api/orders from many threads and reports
+orders/second and latency for each commit path:
+
+    per-request   each request commits its own transaction (the default)
+    write-queue   requests hand their writes to one writer thread that commits
+                  them in batches (WRITE_QUEUE_ENABLED=1)
+
+at synchronous=NORMAL and at synchronous=FULL, where every commit waits for
+an fsync and acknowledged writes survive a power loss. Each configuration
+runs in its own process on a fresh database.
+
+    python benchmarks/group_commit.py --orders 3000 --threads 32
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIGURATIONS = [
+    ('per-request', 'NORMAL', {'WRITE_QUEUE_ENABLED': '0', 'DB_SYNCHRONOUS': 'NORMAL'}),
+    ('write-queue', 'NORMAL', {'WRITE_QUEUE_ENABLED': '1', 'WRITE_QUEUE_SYNCHRONOUS': 'NORMAL'}),
+    ('per-request', 'FULL', {'WRITE_QUEUE_ENABLED': '0', 'DB_SYNCHRONOUS': 'FULL'}),
+    ('write-queue', 'FULL', {'WRITE_QUEUE_ENABLED': '1', 'WRITE_QUEUE_SYNCHRONOUS': 'FULL'}),
+]
+
+
+def run_one(args):
+    """Child process: place the orders and print one JSON line of results."""
+    workdir = tempfile.mkdtemp(prefix='phone_store_bench_')
+    os.environ['PHONE_STORE_DB'] = os.path.join(workdir, 'phone_store.db')
+    os.environ.setdefault('DB_POOL_SIZE', str(args.threads))
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    sys.path.insert(0, ROOT)
+    # init_db and the app print progress; keep stdout for the result line
+    result_stream, sys.stdout = sys.stdout, sys.stderr
+
+    import sqlite3
+    import app as phone_store
+
+    try:
+        phone_store.init_db()
+        conn = sqlite3.connect(phone_store.app.config['DATABASE'])
+        conn.execute('UPDATE phones SET stock_quantity = 1000000')
+        conn.commit()
+        phone_ids = [row[0] for row in conn.execute('SELECT id FROM phones')]
+        conn.close()
+
+        client = phone_store.app.test_client()
+        login = client.post('/api/login', json={'username': 'user', 'password': 'user123'})
+        headers = {'Authorization': f"Bearer {login.get_json()['session_token']}"}
+        order = {
+            'customer_name': 'user', 'customer_email': 'user@example.com', 'customer_phone': '555-0100',
+            'quantity': 1, 'house_number': '1', 'street_address': 'Bench Street', 'delivery_city': 'Bench',
+            'delivery_state': 'BS', 'delivery_zip': '00000', 'delivery_country': 'Nowhere'
+        }
+
+        latencies = []
+        statuses = {}
+        lock = threading.Lock()
+
+        def place(i):
+            body = dict(order, phone_id=phone_ids[i % len(phone_ids)])
+            started = time.perf_counter()
+            status = phone_store.app.test_client().post('/api/orders', json=body, headers=headers).status_code
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            list(executor.map(place, range(args.orders)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        result = {
+            'statuses': statuses,
+            'orders_per_second': statuses.get(201, 0) / elapsed,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+            'write_queue': phone_store.write_queue.stats()
+        }
+        print(json.dumps(result), file=result_stream)
+    finally:
+        phone_store.write_queue.shutdown()
+        phone_store.db_pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=3000, help='orders to place per configuration')
+    parser.add_argument('--threads', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_one(args)
+        return
+
+    print(f'{args.orders} orders from {args.threads} threads')
+    print(f'{"path":<12} {"sync":<7} {"orders/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"avg batch":>10} {"statuses"}')
+    for path, synchronous, env in CONFIGURATIONS:
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child',
+                                          '--orders', str(args.orders), '--threads', str(args.threads)],
+                                         env=dict(os.environ, **env), stderr=subprocess.DEVNULL, text=True)
+        result = json.loads(output.strip().splitlines()[-1])
+        batch = result['write_queue']['average_batch'] if env['WRITE_QUEUE_ENABLED'] == '1' else 1
+        print(f'{path:<12} {synchronous:<7} {result["orders_per_second"]:>9.0f} {result["p50_ms"]:>8.1f} '
+              f'{result["p99_ms"]:>8.1f} {batch:>10} {result["statuses"]}')
+
+
+if __name__ == '__main__':
+    main()
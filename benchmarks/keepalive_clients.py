@@ -0,0 +1,160 @@
+"""Many concurrent keep-alive clients against server.py and asgi.py.
+
+Opens --clients persistent connections to a freshly started server and
+keeps all of them open for --duration seconds. Each client sends a catalog
+or session request, then idles for --think seconds (as a browser tab does
+between clicks) before sending the next. Reports completed requests,
+failures and latency for each server:
+
+    server.py   one worker process, a thread per in-flight connection
+    asgi.py     one process, an event loop holding every connection
+
+    python benchmarks/keepalive_clients.py --clients 2000 --duration 20 --think 1
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(reader, writer, path, token):
+    headers = f'Authorization: Bearer {token}\r\n' if token else ''
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: bench\r\n{headers}\r\n'.encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port, args, token, phone_ids, deadline, results):
+    rng = random.Random()
+    await asyncio.sleep(rng.uniform(0, args.think))
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), args.timeout)
+    except (OSError, asyncio.TimeoutError):
+        results['connect_failures'] += 1
+        return
+    try:
+        while time.monotonic() < deadline:
+            roll = rng.random()
+            if roll < 0.5:
+                path = '/api/phones'
+            elif roll < 0.8:
+                path = f'/api/phones/{rng.choice(phone_ids)}'
+            else:
+                path = '/api/user'
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(fetch(reader, writer, path, token if path == '/api/user' else None),
+                                                args.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                results['failures'] += 1
+                return
+            results['latencies'].append(time.perf_counter() - started)
+            if status != 200:
+                results['failures'] += 1
+            await asyncio.sleep(args.think * rng.uniform(0.5, 1.5))
+    finally:
+        writer.close()
+
+
+async def drive(port, args, token, phone_ids):
+    results = {'latencies': [], 'failures': 0, 'connect_failures': 0}
+    deadline = time.monotonic() + args.duration
+    await asyncio.gather(*(client(port, args, token, phone_ids, deadline, results) for _ in range(args.clients)))
+    return results
+
+
+def start(command, env, port, workdir):
+    log = open(os.path.join(workdir, 'server.log'), 'a')
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f'{command[1]} did not start, see {log.name}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=2000, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of traffic')
+    parser.add_argument('--think', type=float, default=1.0, help='average idle seconds between requests')
+    parser.add_argument('--threads', type=int, default=8, help='request threads for either server')
+    parser.add_argument('--timeout', type=float, default=10, help='seconds before a request counts as failed')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='phone_store_bench_')
+    database = os.path.join(workdir, 'phone_store.db')
+    env = dict(os.environ, PHONE_STORE_DB=database, DB_POOL_SIZE=str(args.threads))
+    sys.path.insert(0, ROOT)
+    try:
+        subprocess.run([sys.executable, '-c', 'import app; app.init_db()'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        conn = sqlite3.connect(database)
+        phone_ids = [row[0] for row in conn.execute('SELECT id FROM phones')]
+        conn.close()
+
+        print(f'{args.clients} keep-alive clients for {args.duration:g}s, ~{args.think:g}s between requests')
+        print(f'{"server":<10} {"requests":>9} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"failures":>9} '
+              f'{"no connect":>11}')
+        for name, command in [
+                ('server.py', [sys.executable, os.path.join(ROOT, 'server.py'), '--workers', '1',
+                               '--threads', str(args.threads), '--keepalive', str(args.think * 3 + 5),
+                               '--no-access-log']),
+                ('asgi.py', [sys.executable, os.path.join(ROOT, 'asgi.py'), '--server', 'builtin',
+                             '--read-threads', str(args.threads), '--threads', str(args.threads)])]:
+            port = free_port()
+            process = start(command + ['--bind', f'127.0.0.1:{port}'], env, port, workdir)
+            try:
+                token = login(port)
+                results = asyncio.run(drive(port, args, token, phone_ids))
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+            latencies = sorted(results['latencies'])
+            p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0
+            print(f'{name:<10} {len(latencies):>9} {len(latencies) / args.duration:>8.0f} {p50:>8.1f} {p99:>8.1f} '
+                  f'{results["failures"]:>9} {results["connect_failures"]:>11}')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def login(port):
+    import http.client
+    import json
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('POST', '/api/login', body=json.dumps({'username': 'user', 'password': 'user123'}),
+                 headers={'Content-Type': 'application/json'})
+    token = json.loads(conn.getresponse().read())['session_token']
+    conn.close()
+    return token
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,540 @@
+"""Reproducible load test for the phone store API.
+
+Seeds a database with synthetic phones, users, sessions and orders, then
+drives the Flask test client in-process, a real multi-worker server.py or
+the asgi.py event loop with a weighted traffic mix, and prints p50/p90/p99 latency and
+throughput per endpoint as JSON. Save the output of two commits and
+compare them with --compare.
+
+    python benchmarks/load_test.py --requests 5000 --output before.json
+    python benchmarks/load_test.py --target server --workers 4 --threads 8 --output after.json
+    python benchmarks/load_test.py --compare before.json after.json
+
+Large datasets take a while to seed; pass --db to keep one and reuse it
+across runs (it is reseeded only when the sizes or seed change; checkout
+traffic adds orders to it, so delete it for a pristine baseline):
+
+    python benchmarks/load_test.py --db /var/tmp/bench.db --phones 100000 --orders 10000000 \\
+        --users 100000 --sessions 1000000
+
+Traffic scenarios and their default weights (--mix browse=60,session=10,...):
+    browse    GET /api/phones (sorted, filtered, paged), /api/phones/<id>, /api/phones/search
+    session   GET /api/user, /api/user/orders with a seeded session token
+    login     POST /api/login
+    checkout  POST /api/orders
+    admin     GET /api/admin/stats, /api/reports/sales, /api/reports/trends, /api/orders
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = 'browse=60,session=10,login=5,checkout=15,admin=10'
+BENCH_PASSWORD = 'bench-password'
+BRANDS = ['Apple', 'Samsung', 'Google', 'OnePlus', 'Xiaomi', 'Sony', 'Motorola', 'Nokia']
+COLORS = ['Black', 'White', 'Blue', 'Green', 'Silver', 'Gold']
+STORAGE = ['64GB', '128GB', '256GB', '512GB']
+STATUSES = ['pending', 'processing', 'shipped', 'delivered', 'cancelled']
+SORTS = ['newest', 'price_low', 'price_high', 'name']
+CHUNK_SIZE = 50000
+
+
+# ========== SEEDING ==========
+
+def chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(conn, sql, rows, label, total):
+    started = time.perf_counter()
+    done = 0
+    for chunk in chunks(rows):
+        conn.executemany(sql, chunk)
+        conn.commit()
+        done += len(chunk)
+        print(f'  {label}: {done:,}/{total:,}', end='\r', file=sys.stderr)
+    print(f'  {label}: {total:,} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+
+def seed_database(phone_store, args):
+    """Bulk-load synthetic rows with triggers disabled, then rebuild what they maintain."""
+    from database import rebuild_order_buckets, rebuild_sales_rollup, reconcile_dashboard_stats
+    from passwords import make_hash
+
+    rng = random.Random(args.seed)
+    conn = sqlite3.connect(phone_store.app.config['DATABASE'])
+    conn.execute('PRAGMA synchronous = OFF')
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER {name}')
+    conn.commit()
+
+    print(f'🌱 Seeding {args.phones:,} phones, {args.users:,} users, {args.sessions:,} sessions, '
+          f'{args.orders:,} orders', file=sys.stderr)
+    first_phone = conn.execute('SELECT COALESCE(MAX(id), 0) FROM phones').fetchone()[0] + 1
+    prices = [round(rng.uniform(99, 1999), 2) for _ in range(args.phones)]
+    bulk_insert(conn, '''INSERT INTO phones (sku, brand, model, price, storage, color, stock_quantity,
+                                             description, image_url) VALUES (?,?,?,?,?,?,?,?,?)''',
+                ((f'LOAD-{i}', rng.choice(BRANDS), f'Model {i}', prices[i], rng.choice(STORAGE),
+                  rng.choice(COLORS), 1000000, f'{rng.choice(COLORS)} phone with {rng.choice(STORAGE)} storage',
+                  f'https://example.com/phones/{i}.png') for i in range(args.phones)),
+                'phones', args.phones)
+
+    # Every synthetic user shares one hash, computed at the configured cost
+    password_hash = make_hash(BENCH_PASSWORD, phone_store.password_hasher.algorithm, phone_store.password_hasher.cost)
+    first_user = conn.execute('SELECT COALESCE(MAX(id), 0) FROM users').fetchone()[0] + 1
+    bulk_insert(conn, 'INSERT INTO users (username, email, password_hash) VALUES (?,?,?)',
+                ((f'loaduser{i}', f'loaduser{i}@example.com', password_hash) for i in range(args.users)),
+                'users', args.users)
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    valid_until = (now + timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+    expired_at = (now - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    bulk_insert(conn, 'INSERT INTO sessions (user_id, session_token, expires_at) VALUES (?,?,?)',
+                ((first_user + rng.randrange(max(args.users, 1)), f'{rng.getrandbits(256):064x}',
+                  valid_until if rng.random() < 0.9 else expired_at) for _ in range(args.sessions)),
+                'sessions', args.sessions)
+
+    def orders():
+        for _ in range(args.orders):
+            phone = rng.randrange(args.phones)
+            user = rng.randrange(max(args.users, 1))
+            quantity = rng.randint(1, 3)
+            created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+            yield (first_phone + phone, f'loaduser{user}', f'loaduser{user}@example.com', '555-0100', quantity,
+                   round(prices[phone] * quantity, 2), rng.choice(STATUSES), str(rng.randint(1, 999)),
+                   'Load Street', 'Springfield', 'ST', '12345', 'USA', '',
+                   created_at.strftime('%Y-%m-%d %H:%M:%S'))
+
+    if args.phones:
+        bulk_insert(conn, '''INSERT INTO orders (phone_id, customer_name, customer_email, customer_phone, quantity,
+                                                 total_price, status, house_number, street_address, delivery_city,
+                                                 delivery_state, delivery_zip, delivery_country, delivery_notes,
+                                                 created_at) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                    orders(), 'orders', args.orders)
+
+    for _, sql in triggers:
+        conn.execute(sql)
+    conn.execute("UPDATE catalog_version SET version = version + 1, updated_at = CAST(strftime('%s', 'now') AS INTEGER)")
+    conn.commit()
+
+    print('  rebuilding rollups, search index and statistics...', file=sys.stderr)
+    conn.execute('PRAGMA synchronous = NORMAL')
+    rebuild_sales_rollup(conn)
+    rebuild_order_buckets(conn)
+    reconcile_dashboard_stats(conn)
+    conn.execute("INSERT INTO phones_fts (phones_fts) VALUES ('rebuild')")
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+
+def prepare_database(args, workdir):
+    database = args.db or os.path.join(workdir, 'phone_store.db')
+    os.environ['PHONE_STORE_DB'] = database
+    if not args.rate_limits:
+        # Every simulated client shares one address, which the per-IP budgets would throttle
+        os.environ['RATE_LIMIT_ENABLED'] = '0'
+    sizes = {'phones': args.phones, 'orders': args.orders, 'users': args.users, 'sessions': args.sessions,
+             'seed': args.seed}
+    marker = database + '.seed.json'
+    if os.path.exists(database) and os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == sizes:
+                print(f'♻️  Reusing seeded database {database}', file=sys.stderr)
+                return import_app()
+    for suffix in ('', '-wal', '-shm', '.seed.json'):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+
+    phone_store = import_app()
+    phone_store.init_db()
+    seed_database(phone_store, args)
+    with open(marker, 'w') as f:
+        json.dump(sizes, f)
+    return phone_store
+
+
+def import_app():
+    sys.path.insert(0, ROOT)
+    import app as phone_store
+    return phone_store
+
+
+# ========== TRAFFIC ==========
+
+class Scenario:
+    """Builds requests for one traffic class; ``next(rng)`` returns (label, method, path, body, headers)."""
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+
+    def auth(self, token):
+        return {'Authorization': f'Bearer {token}'}
+
+    def browse(self, rng):
+        f = self.fixtures
+        roll = rng.random()
+        if roll < 0.45:
+            query = f'limit=20&sort={rng.choice(SORTS)}'
+            if rng.random() < 0.4:
+                query += f'&brand={rng.choice(BRANDS)}'
+            if rng.random() < 0.2:
+                query += '&in_stock=true'
+            return 'GET /api/phones', 'GET', f'/api/phones?{query}', None, {}
+        if roll < 0.8:
+            return 'GET /api/phones/<id>', 'GET', f'/api/phones/{rng.choice(f["phone_ids"])}', None, {}
+        term = rng.choice(BRANDS + COLORS + STORAGE)
+        return 'GET /api/phones/search', 'GET', f'/api/phones/search?q={term}&limit=20', None, {}
+
+    def session(self, rng):
+        token = rng.choice(self.fixtures['tokens'])
+        if rng.random() < 0.7:
+            return 'GET /api/user', 'GET', '/api/user', None, self.auth(token)
+        return 'GET /api/user/orders', 'GET', '/api/user/orders', None, self.auth(token)
+
+    def login(self, rng):
+        # Logging in ends the user's other sessions, so a few session requests get a 401 afterwards
+        username = rng.choice(self.fixtures['usernames'])
+        return 'POST /api/login', 'POST', '/api/login', {'username': username, 'password': BENCH_PASSWORD}, {}
+
+    def checkout(self, rng):
+        order = {'phone_id': rng.choice(self.fixtures['phone_ids']), 'customer_name': 'load customer',
+                 'customer_email': 'load@example.com', 'customer_phone': '555-0100', 'quantity': 1,
+                 'house_number': '1', 'street_address': 'Load Street', 'delivery_city': 'Springfield',
+                 'delivery_state': 'ST', 'delivery_zip': '12345', 'delivery_country': 'USA'}
+        return 'POST /api/orders', 'POST', '/api/orders', order, self.auth(rng.choice(self.fixtures['tokens']))
+
+    def admin(self, rng):
+        headers = self.auth(self.fixtures['admin_token'])
+        label, path = rng.choice([('GET /api/admin/stats', '/api/admin/stats'),
+                                  ('GET /api/reports/sales', '/api/reports/sales'),
+                                  ('GET /api/reports/trends', '/api/reports/trends?granularity=week&group_by=brand'),
+                                  ('GET /api/orders', '/api/orders?limit=50')])
+        return label, 'GET', path, None, headers
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('browse', 'session', 'login', 'checkout', 'admin'):
+            raise SystemExit(f'Unknown scenario in --mix: {name}')
+        mix[name] = float(weight)
+    return mix
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body, headers):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_data()
+
+
+class HTTPTransport:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.conn = None
+
+    def request(self, method, path, body, headers):
+        headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, http.client.HTTPException):
+                # The server closes idle keep-alive connections; reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+
+def load_fixtures(transport, database, seed):
+    conn = sqlite3.connect(database)
+    rng = random.Random(seed)
+    phone_ids = [row[0] for row in conn.execute('SELECT id FROM phones ORDER BY id')]
+    tokens = [row[0] for row in conn.execute("SELECT session_token FROM sessions WHERE expires_at > datetime('now') "
+                                             'ORDER BY id LIMIT 5000')]
+    usernames = [row[0] for row in conn.execute("SELECT username FROM users WHERE username LIKE 'loaduser%' "
+                                                'ORDER BY id LIMIT 5000')]
+    conn.close()
+    status, body = transport.request('POST', '/api/login', {'username': 'admin', 'password': 'admin123'}, {})
+    if status != 200:
+        raise SystemExit(f'Admin login failed with status {status}')
+    if not tokens or not usernames:
+        raise SystemExit('The benchmark needs at least one seeded user and session')
+    return {'phone_ids': rng.sample(phone_ids, min(len(phone_ids), 10000)), 'tokens': tokens,
+            'usernames': usernames, 'admin_token': json.loads(body)['session_token']}
+
+
+def run_load(make_transport, fixtures, mix, args):
+    scenario = Scenario(fixtures)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {}
+    lock = threading.Lock()
+    counter = iter(range(args.warmup + args.requests))
+    timing = {}
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        transport = make_transport()
+        local = {}
+        while True:
+            with lock:
+                n = next(counter, None)
+                if n == args.warmup and 'started' not in timing:
+                    timing['started'] = time.perf_counter()
+            if n is None:
+                break
+            label, method, path, body, headers = getattr(scenario, rng.choices(names, weights)[0])(rng)
+            started = time.perf_counter()
+            try:
+                status, _ = transport.request(method, path, body, headers)
+            except Exception:
+                status = 0
+            elapsed = time.perf_counter() - started
+            if n >= args.warmup:
+                entry = local.setdefault(label, ([], {}))
+                entry[0].append(elapsed)
+                entry[1][status] = entry[1].get(status, 0) + 1
+        with lock:
+            for label, (latencies, statuses) in local.items():
+                entry = results.setdefault(label, ([], {}))
+                entry[0].extend(latencies)
+                for status, count in statuses.items():
+                    entry[1][status] = entry[1].get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - timing.get('started', time.perf_counter())
+    return results, elapsed
+
+
+# ========== REPORTING ==========
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status == 0 or status >= 500),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p90_ms': ms(percentile(latencies, 0.90)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                             text=True, stderr=subprocess.DEVNULL).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def build_report(results, elapsed, args, mix):
+    commit, dirty = git_revision()
+    all_latencies = [value for latencies, _ in results.values() for value in latencies]
+    all_statuses = {}
+    for _, statuses in results.values():
+        for status, count in statuses.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    return {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'target': args.target,
+            'workers': args.workers if args.target == 'server' else None,
+            'threads': args.threads if args.target != 'client' else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'sizes': {'phones': args.phones, 'orders': args.orders, 'users': args.users, 'sessions': args.sessions},
+            'mix': mix,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'cpus': os.cpu_count(),
+            'elapsed_s': round(elapsed, 3)
+        },
+        'endpoints': {label: summarize(latencies, statuses, elapsed)
+                      for label, (latencies, statuses) in sorted(results.items())},
+        'total': summarize(all_latencies, all_statuses, elapsed)
+    }
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def change(old, new):
+        if not old or new is None:
+            return '      n/a'
+        return f'{(new - old) / old * 100:+8.1f}%'
+
+    print(f'{before["meta"]["commit"] or before_path} -> {after["meta"]["commit"] or after_path}')
+    print(f'{"endpoint":<28} {"p50 ms":>19} {"p99 ms":>19} {"req/s":>19}')
+    rows = sorted(set(before['endpoints']) | set(after['endpoints'])) + ['total']
+    for label in rows:
+        old = before['total'] if label == 'total' else before['endpoints'].get(label, {})
+        new = after['total'] if label == 'total' else after['endpoints'].get(label, {})
+        cells = []
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            cells.append(f'{new.get(key) or 0:>9.2f} {change(old.get(key), new.get(key))}')
+        print(f'{label:<28} ' + ' '.join(cells))
+
+
+# ========== SERVER TARGET ==========
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, workdir):
+    port = free_port()
+    env = dict(os.environ, DB_POOL_SIZE=str(max(args.threads, 8)))
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    if args.target == 'asgi':
+        command = [os.path.join(ROOT, 'asgi.py'), '--read-threads', str(args.threads), '--threads', str(args.threads)]
+    else:
+        command = [os.path.join(ROOT, 'server.py'), '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--no-access-log']
+    process = subprocess.Popen([sys.executable] + command + ['--bind', f'127.0.0.1:{port}'],
+                               env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'server.py exited with status {process.returncode}, see {log.name}')
+        try:
+            status, _ = HTTPTransport('127.0.0.1', port).request('GET', '/api/health', None, {})
+            if status == 200:
+                return process, port
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise SystemExit('server.py did not start within 60 seconds')
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two saved reports')
+    parser.add_argument('--target', choices=['client', 'server', 'asgi'], default='client',
+                        help='Flask test client, server.py workers, or the asgi.py event loop')
+    parser.add_argument('--db', help='seeded database to create or reuse (default: a temporary file)')
+    parser.add_argument('--phones', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1, help='random seed for data and traffic')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario weights')
+    parser.add_argument('--requests', type=int, default=2000, help='measured requests')
+    parser.add_argument('--warmup', type=int, default=200, help='unmeasured requests sent first')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='server.py worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='server.py threads per worker, asgi.py threads per pool')
+    parser.add_argument('--rate-limits', action='store_true', help='keep the login/register/order rate limits on')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    mix = parse_mix(args.mix)
+    # The app prints progress and slow queries; keep stdout for the report
+    report_stream, sys.stdout = sys.stdout, sys.stderr
+    workdir = tempfile.mkdtemp(prefix='phone_store_load_')
+    server = None
+    try:
+        phone_store = prepare_database(args, workdir)
+        database = phone_store.app.config['DATABASE']
+        if args.target != 'client':
+            server, port = start_server(args, workdir)
+            make_transport = lambda: HTTPTransport('127.0.0.1', port)
+        else:
+            make_transport = lambda: TestClientTransport(phone_store.app)
+
+        fixtures = load_fixtures(make_transport(), database, args.seed)
+        print(f'🚦 {args.warmup} warmup + {args.requests} requests from {args.concurrency} clients '
+              f'against {args.target}', file=sys.stderr)
+        results, elapsed = run_load(make_transport, fixtures, mix, args)
+        report = json.dumps(build_report(results, elapsed, args, mix), indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(report + '\n')
+            print(f'📄 Report written to {args.output}', file=sys.stderr)
+        else:
+            print(report, file=report_stream)
+    finally:
+        if server is not None:
+            stop_server(server)
+        if 'phone_store' in locals():
+            phone_store.db_pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Concurrent checkout stress test for POST /api/orders.
+
+Fires many simultaneous single-unit orders at one phone from a pool of
+threads and checks that the number of successful orders never exceeds
+the stock that was available (no oversell), then prints throughput.
+
+    python benchmarks/order_contention.py --orders 2000 --threads 32 --stock 500
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000, help='orders to attempt')
+    parser.add_argument('--threads', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--stock', type=int, default=500, help='initial stock of the contended phone')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='phone_store_bench_')
+    os.environ['PHONE_STORE_DB'] = os.path.join(workdir, 'phone_store.db')
+    os.environ.setdefault('DB_POOL_SIZE', str(args.threads))
+    # All threads share one client address; measure the endpoint, not the per-IP rate limit
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    sys.path.insert(0, ROOT)
+
+    import sqlite3
+    import app as phone_store
+
+    try:
+        phone_store.init_db()
+        conn = sqlite3.connect(phone_store.app.config['DATABASE'])
+        conn.execute('UPDATE phones SET stock_quantity = ? WHERE id = 1', (args.stock,))
+        conn.commit()
+
+        client = phone_store.app.test_client()
+        login = client.post('/api/login', json={'username': 'user', 'password': 'user123'})
+        headers = {'Authorization': f"Bearer {login.get_json()['session_token']}"}
+        order = {
+            'phone_id': 1, 'customer_name': 'user', 'customer_email': 'user@example.com',
+            'customer_phone': '555-0100', 'quantity': 1, 'house_number': '1',
+            'street_address': 'Bench Street', 'delivery_city': 'Bench', 'delivery_state': 'BS',
+            'delivery_zip': '00000', 'delivery_country': 'Nowhere'
+        }
+
+        statuses = {}
+        lock = threading.Lock()
+
+        def place(_):
+            status = phone_store.app.test_client().post('/api/orders', json=order, headers=headers).status_code
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            list(executor.map(place, range(args.orders)))
+        elapsed = time.perf_counter() - started
+
+        stock_left = conn.execute('SELECT stock_quantity FROM phones WHERE id = 1').fetchone()[0]
+        ordered = conn.execute('SELECT COALESCE(SUM(quantity), 0) FROM orders WHERE phone_id = 1 '
+                               'AND customer_name = ?', ('user',)).fetchone()[0]
+        conn.close()
+
+        accepted = statuses.get(201, 0)
+        print(f'orders attempted : {args.orders} from {args.threads} threads')
+        print(f'status counts    : {dict(sorted(statuses.items()))}')
+        print(f'accepted / stock : {accepted} / {args.stock} (stock left {stock_left})')
+        print(f'throughput       : {args.orders / elapsed:.0f} requests/s, {accepted / elapsed:.0f} orders/s')
+
+        assert stock_left >= 0, 'stock went negative'
+        assert accepted == min(args.orders, args.stock), 'accepted orders do not match available stock'
+        assert ordered == accepted and stock_left == args.stock - accepted, 'orders and stock disagree'
+        print('✅ no oversell')
+    finally:
+        phone_store.db_pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Login throughput for each password hashing cost setting.
+
+For every cost, registers a user hashed at that cost and then fires
+concurrent POST /api/login requests from a pool of threads, printing
+logins/second and latency. A second pass times catalog requests while
+the logins are running, to show they are not starved.
+
+    python benchmarks/password_hashing.py --algorithm pbkdf2_sha256 --costs 100000,390000,600000
+    python benchmarks/password_hashing.py --algorithm scrypt --costs 13,14,15 --workers 2
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_COSTS = {'pbkdf2_sha256': '100000,390000,600000', 'scrypt': '13,14,15'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--algorithm', default='pbkdf2_sha256', choices=sorted(DEFAULT_COSTS))
+    parser.add_argument('--costs', help='comma separated cost settings (iterations, or log2 N for scrypt)')
+    parser.add_argument('--logins', type=int, default=100, help='logins per cost setting')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--workers', type=int, default=None, help='hashing pool size (default: half the cores)')
+    args = parser.parse_args()
+    costs = [int(cost) for cost in (args.costs or DEFAULT_COSTS[args.algorithm]).split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='phone_store_bench_')
+    os.environ['PHONE_STORE_DB'] = os.path.join(workdir, 'phone_store.db')
+    os.environ['PASSWORD_HASH_MAX_PENDING'] = str(args.threads)
+    # All threads share one client address; measure the endpoint, not the per-IP rate limit
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    sys.path.insert(0, ROOT)
+
+    import app as phone_store
+    from passwords import PasswordHasher, default_workers
+
+    try:
+        phone_store.init_db()
+        print(f'{"cost":>10} {"logins/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"catalog p50 ms":>15}')
+        for cost in costs:
+            phone_store.password_hasher = PasswordHasher(algorithm=args.algorithm, cost=cost,
+                                                         max_workers=args.workers or default_workers(),
+                                                         max_pending=args.threads)
+            username = f'bench_{cost}'
+            credentials = {'username': username, 'password': 'bench-password'}
+            client = phone_store.app.test_client()
+            client.post('/api/register', json=dict(credentials, email=f'{username}@example.com'))
+
+            latencies = []
+            catalog_latencies = []
+            statuses = {}
+            lock = threading.Lock()
+            done = threading.Event()
+
+            def login(_):
+                started = time.perf_counter()
+                status = phone_store.app.test_client().post('/api/login', json=credentials).status_code
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+            def browse():
+                catalog = phone_store.app.test_client()
+                while not done.is_set():
+                    started = time.perf_counter()
+                    catalog.get('/api/phones')
+                    catalog_latencies.append(time.perf_counter() - started)
+
+            browser = threading.Thread(target=browse)
+            browser.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                list(executor.map(login, range(args.logins)))
+            elapsed = time.perf_counter() - started
+            done.set()
+            browser.join()
+            phone_store.password_hasher.shutdown()
+
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            catalog_p50 = statistics.median(catalog_latencies) * 1000 if catalog_latencies else float('nan')
+            print(f'{cost:>10} {statuses.get(200, 0) / elapsed:>9.1f} {statistics.median(latencies) * 1000:>8.1f} '
+                  f'{p99 * 1000:>8.1f} {catalog_p50:>15.2f}')
+            if set(statuses) != {200}:
+                print(f'{"":>10} status counts: {dict(sorted(statuses.items()))}')
+    finally:
+        phone_store.db_pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
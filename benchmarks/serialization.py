@@ -0,0 +1,135 @@
+"""Row mapping and JSON encoding throughput for the catalog and order listings.
+
+Seeds a temporary database with synthetic phones and orders, then compares
+for GET /api/phones and GET /api/orders:
+
+    legacy   hand-indexed dicts + stdlib json, pretty-printed and key-sorted
+             as jsonify did in debug mode
+    stdlib   compiled row mappers + compact stdlib json
+    orjson   compiled row mappers + orjson (skipped when not installed)
+
+and reports rows/second and response bytes for each, followed by
+end-to-end requests/second through the Flask test client.
+
+    python benchmarks/serialization.py --phones 5000 --orders 20000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_phone(row):
+    return {'id': row[0], 'brand': row[1], 'model': row[2], 'price': row[3], 'storage': row[4],
+            'color': row[5], 'stock_quantity': row[6], 'description': row[7], 'image_url': row[8]}
+
+
+def legacy_order(row):
+    return {'id': row[0], 'phone_id': row[1], 'customer_name': row[2], 'customer_email': row[3],
+            'customer_phone': row[4], 'quantity': row[5], 'total_price': row[6], 'status': row[7],
+            'house_number': row[8], 'street_address': row[9], 'delivery_city': row[10],
+            'delivery_state': row[11], 'delivery_zip': row[12], 'delivery_country': row[13],
+            'delivery_notes': row[14], 'created_at': row[15], 'brand': row[16], 'model': row[17],
+            'storage': row[18], 'color': row[19]}
+
+
+def seed(database, phones, orders):
+    conn = sqlite3.connect(database)
+    brands = ['Apple', 'Samsung', 'Google', 'OnePlus', 'Xiaomi', 'Sony']
+    conn.executemany('''INSERT INTO phones (sku, brand, model, price, storage, color, stock_quantity, description, image_url)
+                        VALUES (?,?,?,?,?,?,?,?,?)''',
+                     [(f'BENCH-{i}', random.choice(brands), f'Model {i}', round(random.uniform(99, 1999), 2),
+                       random.choice(['64GB', '128GB', '256GB']), random.choice(['Black', 'White', 'Blue']),
+                       random.randint(0, 100), 'Synthetic benchmark phone ' * 3, f'https://example.com/{i}.png')
+                      for i in range(phones)])
+    phone_ids = [row[0] for row in conn.execute('SELECT id FROM phones')]
+    conn.executemany('''INSERT INTO orders (phone_id, customer_name, customer_email, customer_phone, quantity,
+                                            total_price, status, house_number, street_address, delivery_city,
+                                            delivery_state, delivery_zip, delivery_country, delivery_notes)
+                        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                     [(random.choice(phone_ids), f'customer{i}', f'customer{i}@example.com', '555-0100',
+                       random.randint(1, 3), round(random.uniform(99, 5000), 2), 'pending', str(i),
+                       'Bench Street', 'Springfield', 'ST', '12345', 'USA', None)
+                      for i in range(orders)])
+    conn.commit()
+    conn.close()
+
+
+def measure(label, rows, to_dict, encode, key, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = encode({key: [to_dict(row) for row in rows]})
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f'{label:<10} {len(rows) / elapsed:>12,.0f} {len(body):>12,}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--phones', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=50, help='requests per endpoint for the end-to-end pass')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='phone_store_bench_')
+    os.environ['PHONE_STORE_DB'] = os.path.join(workdir, 'phone_store.db')
+    # Measure serialization, not the response cache
+    os.environ['CATALOG_CACHE_SIZE'] = '0'
+    sys.path.insert(0, ROOT)
+
+    import app as phone_store
+    import serialization
+
+    try:
+        phone_store.init_db()
+        seed(phone_store.app.config['DATABASE'], args.phones, args.orders)
+        conn = sqlite3.connect(phone_store.app.config['DATABASE'])
+        phone_rows = conn.execute(f'SELECT {phone_store.PHONE_COLUMNS} FROM phones').fetchall()
+        order_rows = conn.execute(f'SELECT {phone_store.ORDER_COLUMNS} FROM orders o '
+                                  'JOIN phones p ON o.phone_id = p.id').fetchall()
+        conn.close()
+
+        legacy = lambda obj: json.dumps(obj, indent=2, sort_keys=True).encode()
+        stdlib = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+        backends = [('stdlib', stdlib)]
+        if serialization.orjson is not None:
+            backends.append(('orjson', serialization.dumps))
+
+        for name, rows, legacy_map, mapper, key in [
+                ('phones', phone_rows, legacy_phone, phone_store.phone_to_dict, 'phones'),
+                ('orders', order_rows, legacy_order, phone_store.order_to_dict, 'orders')]:
+            print(f'\n{name} ({len(rows)} rows)')
+            print(f'{"path":<10} {"rows/s":>12} {"bytes":>12}')
+            measure('legacy', rows, legacy_map, legacy, key, args.repeat)
+            for label, encode in backends:
+                measure(label, rows, mapper, encode, key, args.repeat)
+
+        client = phone_store.app.test_client()
+        login = client.post('/api/login', json={'username': 'admin', 'password': 'admin123'})
+        headers = {'Authorization': f"Bearer {login.get_json()['session_token']}"}
+        available = serialization.orjson
+        print('\nend to end (test client)')
+        print(f'{"endpoint":<28} {"backend":<8} {"req/s":>8} {"bytes":>10}')
+        for path in ['/api/phones', '/api/phones?limit=200', '/api/orders?limit=200']:
+            for label in [label for label, _ in backends]:
+                serialization.orjson = available if label == 'orjson' else None
+                started = time.perf_counter()
+                for _ in range(args.requests):
+                    body = client.get(path, headers=headers).get_data()
+                elapsed = time.perf_counter() - started
+                print(f'{path:<28} {label:<8} {args.requests / elapsed:>8.1f} {len(body):>10,}')
+        serialization.orjson = available
+    finally:
+        phone_store.db_pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# ========== SESSION CACHE ==========
+
+class SessionCache:
+    """Bounded LRU cache of authenticated users keyed by session token.
+
+    Entries expire after ``ttl`` seconds or at the session's own expiry,
+    whichever comes first. A reverse index from user id to tokens lets
+    login, profile updates and user deletion drop every cached session
+    of a user at once.
+
+    Sessions ended by other processes are logged in the session_invalidations
+    table; ``sync`` reads the new rows at most once per ``poll_interval``
+    seconds, which bounds how long another worker keeps honouring them.
+    """
+
+    def __init__(self, max_size=10000, ttl=60.0, poll_interval=1.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._entries = OrderedDict()  # token -> (user, expires_at)
+        self._tokens_by_user = {}
+        self._invalidation_id = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.remote_invalidations = 0
+
+    def sync(self, load_invalidations):
+        """Drop cached sessions of users logged in the invalidation table.
+
+        ``load_invalidations(after_id)`` returns the (id, user_id) rows newer
+        than ``after_id``; given None it returns just the newest id, where
+        this process starts reading.
+        """
+        if self.max_size <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.poll_interval:
+                return
+            # Claim the poll so concurrent requests do not all hit the database
+            self._checked_at = now
+            after_id = self._invalidation_id
+        rows = load_invalidations(after_id)
+        with self._lock:
+            for invalidation_id, user_id in rows:
+                for token in list(self._tokens_by_user.get(user_id, ())):
+                    self._remove(token)
+                    self.remote_invalidations += 1
+                self._invalidation_id = max(self._invalidation_id or 0, invalidation_id or 0)
+
+    def get(self, token):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return dict(user)
+
+    def set(self, token, user, session_expires_at):
+        if self.max_size <= 0:
+            return
+        expires_at = min(time.time() + self.ttl, session_expires_at)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (dict(user), expires_at)
+            self._tokens_by_user.setdefault(user['id'], set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_token(self, token):
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token):
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user['id'])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user['id']]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'remote_invalidations': self.remote_invalidations
+            }
+
+
+# ========== CATALOG RESPONSE CACHE ==========
+
+class CatalogCache:
+    """Serialized catalog responses keyed by request, valid for one catalog version.
+
+    The authoritative version lives in the catalog_version table and is bumped
+    by triggers on phones, so writes from any process are picked up. Reading it
+    is rate-limited to once per ``poll_interval`` seconds; local writers call
+    ``invalidate()`` so their own changes are visible on the next request.
+    """
+
+    def __init__(self, max_entries=512, poll_interval=1.0):
+        self.max_entries = max_entries
+        self.poll_interval = poll_interval
+        self._entries = OrderedDict()  # key -> (body, etag)
+        self._version = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def version(self, load_version):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.poll_interval:
+                return self._version
+        version = load_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+        return version
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = float('-inf')
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def get(self, key, version):
+        with self._lock:
+            if version != self._version or key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key, version, body, etag):
+        with self._lock:
+            if version == self._version and self.max_entries > 0:
+                self._entries[key] = (body, etag)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return body, etag
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified
+            }
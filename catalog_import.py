@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+import sqlite3
+
+from database import write_transaction
+
+# Supplier rows are matched on sku: existing phones are updated in place,
+# unknown skus are inserted.
+IMPORT_FIELDS = ['sku', 'brand', 'model', 'price', 'storage', 'color', 'stock_quantity', 'description', 'image_url']
+REQUIRED_FIELDS = ['sku', 'brand', 'model', 'price', 'storage', 'color', 'stock_quantity']
+
+UPSERT_SQL = '''INSERT INTO phones (sku, brand, model, price, storage, color, stock_quantity, description, image_url)
+                VALUES (?,?,?,?,?,?,?,?,?)
+                ON CONFLICT (sku) DO UPDATE SET
+                    brand = excluded.brand,
+                    model = excluded.model,
+                    price = excluded.price,
+                    storage = excluded.storage,
+                    color = excluded.color,
+                    stock_quantity = excluded.stock_quantity,
+                    description = excluded.description,
+                    image_url = excluded.image_url'''
+
+MAX_REPORTED_ERRORS = 100
+
+# Errors that belong to one row's values rather than to the database as a whole
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.ProgrammingError, sqlite3.InterfaceError)
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, dict) pairs from a text stream of CSV or JSON Lines."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f'Invalid JSON: {e}')
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def text_field(row, field):
+    # JSON Lines rows can hold any JSON value; only strings and numbers make sense as text
+    value = row.get(field)
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f'Field "{field}" must be text')
+    return str(value)
+
+
+def validate_row(row):
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+
+    for field in REQUIRED_FIELDS:
+        if row.get(field) in (None, ''):
+            raise ValueError(f'Field "{field}" is required')
+
+    try:
+        price = float(row['price'])
+        stock_quantity = int(row['stock_quantity'])
+    except (ValueError, TypeError):
+        raise ValueError('Invalid price or stock quantity format')
+    if price < 0 or stock_quantity < 0:
+        raise ValueError('Price and stock quantity must not be negative')
+
+    return (text_field(row, 'sku'), text_field(row, 'brand'), text_field(row, 'model'), price,
+            text_field(row, 'storage'), text_field(row, 'color'), stock_quantity,
+            text_field(row, 'description'), text_field(row, 'image_url'))
+
+
+def import_phones(conn, rows, chunk_size=5000, retries=5):
+    """Upsert validated rows into phones in chunked write transactions.
+
+    ``rows`` is an iterable of (line_number, dict) as produced by read_rows,
+    so input is consumed incrementally and never held in memory as a whole.
+    If a chunk hits a constraint or binding error it is replayed row by row
+    so the offending lines can be reported and the rest still imported.
+    """
+    report = {'processed': 0, 'imported': 0, 'error_count': 0, 'errors': []}
+
+    def record_error(line_number, message):
+        report['error_count'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_number, 'error': message})
+
+    def flush(chunk):
+        try:
+            write_transaction(conn, lambda c: c.executemany(UPSERT_SQL, [values for _, values in chunk]),
+                              retries=retries)
+            report['imported'] += len(chunk)
+        except ROW_ERRORS:
+            for line_number, values in chunk:
+                try:
+                    write_transaction(conn, lambda c: c.execute(UPSERT_SQL, values), retries=retries)
+                    report['imported'] += 1
+                except ROW_ERRORS as e:
+                    record_error(line_number, str(e))
+
+    chunk = []
+    for line_number, row in rows:
+        report['processed'] += 1
+        try:
+            chunk.append((line_number, validate_row(row)))
+        except ValueError as e:
+            record_error(line_number, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    return report
+
+
+def detect_format(content_type, filename=None, default='csv'):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+        return 'jsonl'
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def text_stream(binary_stream):
+    # newline='' keeps embedded newlines in quoted CSV fields intact
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
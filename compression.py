@@ -0,0 +1,124 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'text/')
+
+# Cached payloads are compressed once and served many times, so they get the strongest settings
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+
+
+# ========== RESPONSE COMPRESSION ==========
+
+class ResponseCompressor:
+    """Compresses response bodies with brotli or gzip, whichever the client prefers.
+
+    Bodies smaller than ``min_size`` are sent as they are. Cacheable payloads
+    (public responses with a strong ETag) are compressed once per ETag and
+    encoding and kept in a bounded LRU of ``cache_size`` entries.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, cache_size=256):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (etag, encoding) -> compressed body
+        self._lock = threading.Lock()
+
+        self.compressed = {}
+        self.skipped_small = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def is_compressible(self, response):
+        return (response.mimetype.startswith(COMPRESSIBLE_TYPES)
+                and 'Content-Encoding' not in response.headers)
+
+    def compress(self, data, encoding, cached=False):
+        if encoding == 'br':
+            return brotli.compress(data, quality=CACHED_BROTLI_QUALITY if cached else self.brotli_quality)
+        return gzip.compress(data, compresslevel=CACHED_GZIP_LEVEL if cached else self.gzip_level, mtime=0)
+
+    def compress_body(self, data, encoding, cache_key=None):
+        """Return the compressed body, from the precompressed cache when ``cache_key`` is given."""
+        if cache_key is None or self.cache_size <= 0:
+            body = self.compress(data, encoding)
+        else:
+            key = (cache_key, encoding)
+            with self._lock:
+                body = self._cache.get(key)
+                if body is not None:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            if body is None:
+                body = self.compress(data, encoding, cached=True)
+                with self._lock:
+                    self._cache[key] = body
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        self.record(encoding, len(data), len(body))
+        return body
+
+    def compress_stream(self, chunks, encoding):
+        """Compress a streamed body chunk by chunk; totals are recorded when it ends."""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            process, finish = compressor.process, compressor.finish
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            process, finish = compressor.compress, compressor.flush
+        size_in = size_out = 0
+        try:
+            for chunk in chunks:
+                size_in += len(chunk)
+                data = process(chunk)
+                if data:
+                    size_out += len(data)
+                    yield data
+            data = finish()
+            size_out += len(data)
+            yield data
+        finally:
+            self.record(encoding, size_in, size_out)
+
+    def record(self, encoding, size_in, size_out):
+        with self._lock:
+            self.compressed[encoding] = self.compressed.get(encoding, 0) + 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def record_skipped(self):
+        with self._lock:
+            self.skipped_small += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'encodings': self.encodings,
+                'min_size': self.min_size,
+                'compressed': dict(self.compressed),
+                'skipped_small': self.skipped_small,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'bytes_saved': self.bytes_in - self.bytes_out,
+                'cache_entries': len(self._cache),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses
+            }
@@ -0,0 +1,807 @@
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+DATABASE = os.environ.get('PHONE_STORE_DB', 'phone_store.db')
+
+
+# ========== CONNECTION POOL ==========
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by all request threads.
+
+    Idle connections are kept in a LIFO queue so the most recently used
+    (and therefore warmest) connection is handed out first. At most
+    ``size`` connections exist at once; callers beyond that wait up to
+    ``timeout`` seconds for one to be released.
+    """
+
+    def __init__(self, database=DATABASE, size=8, timeout=10.0, health_check_interval=30.0, pragmas=None,
+                 factory=sqlite3.Connection):
+        self.database = database
+        self.pragmas = pragmas or {}
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._last_used = {}
+
+        self.hits = 0
+        self.waits = 0
+        self.new_connections = 0
+        self.health_check_failures = 0
+        self.timeouts = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False, factory=self.factory)
+        # journal_mode is persistent in the file and is set once by init_db
+        apply_pragmas(conn, self.pragmas, skip=('journal_mode',))
+        with self._lock:
+            self.new_connections += 1
+            self._all.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._all.discard(conn)
+            self._last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn):
+        # Only ping connections that have been sitting idle for a while
+        idle_since = self._last_used.get(id(conn), 0)
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self.health_check_failures += 1
+            return False
+
+    def acquire(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waits += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise sqlite3.OperationalError('Timed out waiting for a database connection')
+
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+
+                if self._is_healthy(conn):
+                    with self._lock:
+                        self.hits += 1
+                    return conn
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            # Never hand out a connection with a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def after_fork(self):
+        # SQLite connections must not cross fork(); a forked worker forgets the
+        # inherited ones without closing them, since closing could drop locks the parent holds
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._all = set()
+        self._last_used = {}
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open_connections': len(self._all),
+                'idle_connections': self._idle.qsize(),
+                'hits': self.hits,
+                'waits': self.waits,
+                'new_connections': self.new_connections,
+                'health_check_failures': self.health_check_failures,
+                'timeouts': self.timeouts
+            }
+
+
+# ========== WRITE TRANSACTIONS ==========
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+def write_transaction(conn, work, retries=5, backoff=0.005):
+    """Run ``work(cursor)`` inside BEGIN IMMEDIATE and commit.
+
+    Taking the write lock up front means the transaction can never fail
+    half-way with a lock upgrade error; if the lock is busy the whole unit
+    is retried with jittered exponential backoff. Any exception raised by
+    ``work`` rolls the transaction back and propagates.
+    """
+    for attempt in range(retries + 1):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            result = work(conn.cursor())
+            conn.commit()
+            return result
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not is_busy_error(e) or attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+
+# ========== GROUP COMMIT ==========
+
+class WriteQueueBusy(sqlite3.OperationalError):
+    pass
+
+
+class WriteQueue:
+    """A single writer thread that group-commits writes submitted by request threads.
+
+    ``submit(work)`` queues ``work(cursor)`` and blocks until the transaction
+    that ran it has committed, then returns its result (an inserted id, say)
+    or raises its exception. The writer takes everything already queued, up
+    to ``max_batch`` intents, waiting at most ``max_delay`` seconds for more,
+    and runs the batch in one BEGIN IMMEDIATE ... COMMIT, so the whole batch
+    pays for a single commit. Each intent runs under its own savepoint: one
+    that raises is rolled back alone and the rest of the batch still commits.
+
+    A caller waits at most ``result_timeout`` seconds and then gets
+    WriteQueueBusy; its intent is dropped if the writer has not started it
+    yet. If the writer thread dies, every pending intent fails and the next
+    ``submit`` starts a new one. After ``shutdown`` submissions are refused.
+    """
+
+    def __init__(self, database=DATABASE, pragmas=None, factory=sqlite3.Connection, timeout=10.0,
+                 max_batch=64, max_delay=0.002, max_pending=1024, retries=5, backoff=0.005, result_timeout=30.0):
+        self.database = database
+        self.pragmas = pragmas or {}
+        self.factory = factory
+        self.timeout = timeout
+        self.result_timeout = result_timeout
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.retries = retries
+        self.backoff = backoff
+        self.after_fork()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False, factory=self.factory)
+        apply_pragmas(conn, self.pragmas, skip=('journal_mode',))
+        return conn
+
+    def submit(self, work):
+        with self._lock:
+            if self._closed:
+                raise WriteQueueBusy('database is busy: write queue is shut down')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+        future = Future()
+        try:
+            self._queue.put((work, future), timeout=self.timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriteQueueBusy('database is busy: write queue is full')
+        # Resolved only after COMMIT returns, so the caller's write is durable when this returns
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeout:
+            # Cancelling only succeeds while the intent is still queued; once the writer
+            # has started it, it may yet commit even though this caller has given up
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise WriteQueueBusy('database is busy: write did not complete in time')
+
+    def _run(self):
+        error = WriteQueueBusy('database is busy: write queue stopped')
+        try:
+            self._serve()
+        except Exception as e:
+            error = e
+            print(f"❌ write-queue failed: {str(e)}")
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+            # Nobody is left to run what is still queued: fail it rather than leave callers waiting
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[1].set_running_or_notify_cancel():
+                    item[1].set_exception(error)
+
+    def _serve(self):
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    try:
+                        remaining = deadline - time.monotonic()
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                try:
+                    self._commit(conn, batch)
+                except BaseException as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    raise
+        finally:
+            conn.close()
+
+    def _begin(self, conn):
+        for attempt in range(self.retries + 1):
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                return
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def _commit(self, conn, batch):
+        # Skip intents whose callers timed out before the writer got to them
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            self._begin(conn)
+            c = conn.cursor()
+            for work, _ in batch:
+                c.execute('SAVEPOINT intent')
+                try:
+                    outcomes.append((work(c), None))
+                except Exception as e:
+                    c.execute('ROLLBACK TO intent')
+                    outcomes.append((None, e))
+                c.execute('RELEASE intent')
+            conn.commit()
+        except sqlite3.Error as e:
+            # The batch as a whole could not be committed: every intent in it fails
+            if conn.in_transaction:
+                conn.rollback()
+            outcomes = [(None, e)] * len(batch)
+
+        failed = 0
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if error is None:
+                future.set_result(result)
+            else:
+                failed += 1
+                future.set_exception(error)
+        with self._lock:
+            self.batches += 1
+            self.committed += len(batch) - failed
+            self.failed += failed
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.commit_seconds += time.perf_counter() - started
+
+    def after_fork(self):
+        # A forked worker gets its own writer thread and connection on first use
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.largest_batch = 0
+        self.commit_seconds = 0.0
+
+    def shutdown(self, timeout=10.0):
+        # Intents queued before the sentinel are still committed
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'batches': self.batches,
+                'committed': self.committed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'largest_batch': self.largest_batch,
+                'average_batch': round((self.committed + self.failed) / self.batches, 2) if self.batches else 0,
+                'average_commit_ms': round(self.commit_seconds / self.batches * 1000, 3) if self.batches else 0
+            }
+
+
+# ========== PRAGMAS ==========
+
+def pragmas_from_env():
+    return {
+        'journal_mode': os.environ.get('DB_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('DB_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': int(os.environ.get('DB_CACHE_SIZE', -16000)),  # negative = KiB
+        'mmap_size': int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024)),
+        'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 5000))  # milliseconds
+    }
+
+def apply_pragmas(conn, pragmas, skip=()):
+    for name, value in pragmas.items():
+        if name not in skip:
+            conn.execute(f'PRAGMA {name} = {value}')
+
+
+# ========== SCHEMA MIGRATIONS ==========
+
+# Recomputes dashboard_stats from the base tables (initial fill and periodic repair)
+RECONCILE_DASHBOARD_STATS_SQL = '''UPDATE dashboard_stats SET
+    total_users = (SELECT COUNT(*) FROM users),
+    total_orders = (SELECT COUNT(*) FROM orders),
+    total_revenue = (SELECT COALESCE(SUM(total_price), 0) FROM orders WHERE status != 'cancelled'),
+    low_stock_items = (SELECT COUNT(*) FROM phones WHERE stock_quantity <= 10 AND stock_quantity > 0),
+    out_of_stock_items = (SELECT COUNT(*) FROM phones WHERE stock_quantity = 0),
+    reconciled_at = CURRENT_TIMESTAMP
+WHERE id = 1'''
+
+def _sales_rollup_add(row, sign, condition='true'):
+    # Trigger body that adds (sign=1) or removes (sign=-1) one order row in both rollups.
+    # The WHERE clause is required by SQLite to parse INSERT ... SELECT ... ON CONFLICT.
+    deltas = f'{sign}, {sign} * {row}.quantity, {sign} * {row}.total_price'
+    on_conflict = '''ON CONFLICT DO UPDATE SET
+                    orders_count = orders_count + excluded.orders_count,
+                    total_quantity = total_quantity + excluded.total_quantity,
+                    total_revenue = total_revenue + excluded.total_revenue'''
+    return f'''INSERT INTO sales_totals (phone_id, orders_count, total_quantity, total_revenue)
+                SELECT {row}.phone_id, {deltas} WHERE {condition} {on_conflict};
+                INSERT INTO sales_daily (phone_id, day, orders_count, total_quantity, total_revenue)
+                SELECT {row}.phone_id, date({row}.created_at), {deltas} WHERE {condition} {on_conflict};'''
+
+# Recomputes both sales rollups from the orders table
+REBUILD_SALES_ROLLUP_SQL = [
+    'DELETE FROM sales_totals',
+    'DELETE FROM sales_daily',
+    '''INSERT INTO sales_totals (phone_id, orders_count, total_quantity, total_revenue)
+       SELECT phone_id, COUNT(*), SUM(quantity), SUM(total_price)
+       FROM orders WHERE phone_id IS NOT NULL GROUP BY phone_id''',
+    '''INSERT INTO sales_daily (phone_id, day, orders_count, total_quantity, total_revenue)
+       SELECT phone_id, date(created_at), COUNT(*), SUM(quantity), SUM(total_price)
+       FROM orders WHERE phone_id IS NOT NULL GROUP BY phone_id, date(created_at)'''
+]
+
+def _order_bucket_add(row, sign):
+    # Trigger body that adds (sign=1) or removes (sign=-1) one order row in its daily bucket.
+    # Brand is resolved when the trigger fires; rebuild_order_buckets re-derives it from phones.
+    return f'''INSERT INTO order_buckets (day, brand, status, orders_count, units, revenue)
+                SELECT date({row}.created_at),
+                       COALESCE((SELECT brand FROM phones WHERE id = {row}.phone_id), 'Unknown'),
+                       COALESCE({row}.status, 'unknown'),
+                       {sign}, {sign} * {row}.quantity, {sign} * {row}.total_price
+                WHERE true
+                ON CONFLICT DO UPDATE SET
+                    orders_count = orders_count + excluded.orders_count,
+                    units = units + excluded.units,
+                    revenue = revenue + excluded.revenue;'''
+
+REBUILD_ORDER_BUCKETS_SQL = [
+    'DELETE FROM order_buckets',
+    '''INSERT INTO order_buckets (day, brand, status, orders_count, units, revenue)
+       SELECT date(o.created_at), COALESCE(p.brand, 'Unknown'), COALESCE(o.status, 'unknown'),
+              COUNT(*), SUM(o.quantity), SUM(o.total_price)
+       FROM orders o LEFT JOIN phones p ON o.phone_id = p.id
+       GROUP BY 1, 2, 3'''
+]
+
+# Append-only list of (version, name, statements). The applied version is
+# stored in PRAGMA user_version, so each step runs exactly once per database.
+MIGRATIONS = [
+    (1, 'initial schema', [
+        '''CREATE TABLE IF NOT EXISTS phones
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            price REAL NOT NULL,
+            storage TEXT NOT NULL,
+            color TEXT NOT NULL,
+            stock_quantity INTEGER NOT NULL,
+            description TEXT,
+            image_url TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS orders
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone_id INTEGER,
+            customer_name TEXT NOT NULL,
+            customer_email TEXT NOT NULL,
+            customer_phone TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            total_price REAL NOT NULL,
+            status TEXT DEFAULT 'pending',
+            house_number TEXT,
+            street_address TEXT,
+            delivery_city TEXT,
+            delivery_state TEXT,
+            delivery_zip TEXT,
+            delivery_country TEXT,
+            delivery_notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (phone_id) REFERENCES phones (id))''',
+        '''CREATE TABLE IF NOT EXISTS users
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            is_admin BOOLEAN DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS sessions
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            session_token TEXT UNIQUE NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME,
+            FOREIGN KEY (user_id) REFERENCES users (id))'''
+    ]),
+    (2, 'secondary indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_orders_customer_name ON orders (customer_name, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_orders_customer_email ON orders (customer_email, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_orders_phone_id ON orders (phone_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_token_expires ON sessions (session_token, expires_at, user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions (user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_phones_stock ON phones (stock_quantity)',
+        'ANALYZE'
+    ]),
+    (3, 'catalog filter and sort indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_phones_brand_price ON phones (brand, price)',
+        'CREATE INDEX IF NOT EXISTS idx_phones_price ON phones (price)',
+        'CREATE INDEX IF NOT EXISTS idx_phones_model ON phones (model)',
+        'ANALYZE'
+    ]),
+    (4, 'catalog version counter', [
+        '''CREATE TABLE IF NOT EXISTS catalog_version
+           (id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL)''',
+        'INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)',
+        '''CREATE TRIGGER IF NOT EXISTS phones_insert_bump_catalog AFTER INSERT ON phones
+           BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_update_bump_catalog AFTER UPDATE ON phones
+           BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_delete_bump_catalog AFTER DELETE ON phones
+           BEGIN UPDATE catalog_version SET version = version + 1 WHERE id = 1; END'''
+    ]),
+    (5, 'phone sku for catalog imports', [
+        'ALTER TABLE phones ADD COLUMN sku TEXT',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_phones_sku ON phones (sku)'
+    ]),
+    (6, 'materialized dashboard counters', [
+        '''CREATE TABLE IF NOT EXISTS dashboard_stats
+           (id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_users INTEGER NOT NULL DEFAULT 0,
+            total_orders INTEGER NOT NULL DEFAULT 0,
+            total_revenue REAL NOT NULL DEFAULT 0,
+            low_stock_items INTEGER NOT NULL DEFAULT 0,
+            out_of_stock_items INTEGER NOT NULL DEFAULT 0,
+            reconciled_at DATETIME)''',
+        'INSERT OR IGNORE INTO dashboard_stats (id) VALUES (1)',
+        # Kept current inside the writing transaction, whichever route or process writes
+        '''CREATE TRIGGER IF NOT EXISTS users_insert_stats AFTER INSERT ON users
+           BEGIN UPDATE dashboard_stats SET total_users = total_users + 1 WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS users_delete_stats AFTER DELETE ON users
+           BEGIN UPDATE dashboard_stats SET total_users = total_users - 1 WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS orders_insert_stats AFTER INSERT ON orders
+           BEGIN UPDATE dashboard_stats SET
+               total_orders = total_orders + 1,
+               total_revenue = total_revenue + CASE WHEN NEW.status != 'cancelled' THEN NEW.total_price ELSE 0 END
+           WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS orders_delete_stats AFTER DELETE ON orders
+           BEGIN UPDATE dashboard_stats SET
+               total_orders = total_orders - 1,
+               total_revenue = total_revenue - CASE WHEN OLD.status != 'cancelled' THEN OLD.total_price ELSE 0 END
+           WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS orders_update_stats AFTER UPDATE OF status, total_price ON orders
+           BEGIN UPDATE dashboard_stats SET
+               total_revenue = total_revenue
+                   - CASE WHEN OLD.status != 'cancelled' THEN OLD.total_price ELSE 0 END
+                   + CASE WHEN NEW.status != 'cancelled' THEN NEW.total_price ELSE 0 END
+           WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_insert_stats AFTER INSERT ON phones
+           BEGIN UPDATE dashboard_stats SET
+               low_stock_items = low_stock_items + (NEW.stock_quantity <= 10 AND NEW.stock_quantity > 0),
+               out_of_stock_items = out_of_stock_items + (NEW.stock_quantity = 0)
+           WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_delete_stats AFTER DELETE ON phones
+           BEGIN UPDATE dashboard_stats SET
+               low_stock_items = low_stock_items - (OLD.stock_quantity <= 10 AND OLD.stock_quantity > 0),
+               out_of_stock_items = out_of_stock_items - (OLD.stock_quantity = 0)
+           WHERE id = 1; END''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_update_stats AFTER UPDATE OF stock_quantity ON phones
+           BEGIN UPDATE dashboard_stats SET
+               low_stock_items = low_stock_items
+                   - (OLD.stock_quantity <= 10 AND OLD.stock_quantity > 0)
+                   + (NEW.stock_quantity <= 10 AND NEW.stock_quantity > 0),
+               out_of_stock_items = out_of_stock_items - (OLD.stock_quantity = 0) + (NEW.stock_quantity = 0)
+           WHERE id = 1; END''',
+        RECONCILE_DASHBOARD_STATS_SQL
+    ]),
+    (7, 'per-phone sales rollup', [
+        '''CREATE TABLE IF NOT EXISTS sales_totals
+           (phone_id INTEGER PRIMARY KEY,
+            orders_count INTEGER NOT NULL DEFAULT 0,
+            total_quantity INTEGER NOT NULL DEFAULT 0,
+            total_revenue REAL NOT NULL DEFAULT 0)''',
+        '''CREATE TABLE IF NOT EXISTS sales_daily
+           (phone_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            orders_count INTEGER NOT NULL DEFAULT 0,
+            total_quantity INTEGER NOT NULL DEFAULT 0,
+            total_revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (phone_id, day)) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_sales_daily_day ON sales_daily (day, phone_id)',
+        f'''CREATE TRIGGER IF NOT EXISTS orders_insert_sales AFTER INSERT ON orders
+            WHEN NEW.phone_id IS NOT NULL
+            BEGIN {_sales_rollup_add('NEW', 1)} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS orders_delete_sales AFTER DELETE ON orders
+            WHEN OLD.phone_id IS NOT NULL
+            BEGIN {_sales_rollup_add('OLD', -1)} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS orders_update_sales
+            AFTER UPDATE OF phone_id, quantity, total_price, created_at ON orders
+            BEGIN
+                {_sales_rollup_add('OLD', -1, 'OLD.phone_id IS NOT NULL')}
+                {_sales_rollup_add('NEW', 1, 'NEW.phone_id IS NOT NULL')}
+            END''',
+        *REBUILD_SALES_ROLLUP_SQL
+    ]),
+    (8, 'daily order buckets by brand and status', [
+        '''CREATE TABLE IF NOT EXISTS order_buckets
+           (day TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            status TEXT NOT NULL,
+            orders_count INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, brand, status)) WITHOUT ROWID''',
+        f'''CREATE TRIGGER IF NOT EXISTS orders_insert_buckets AFTER INSERT ON orders
+            BEGIN {_order_bucket_add('NEW', 1)} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS orders_delete_buckets AFTER DELETE ON orders
+            BEGIN {_order_bucket_add('OLD', -1)} END''',
+        f'''CREATE TRIGGER IF NOT EXISTS orders_update_buckets
+            AFTER UPDATE OF phone_id, status, quantity, total_price, created_at ON orders
+            BEGIN
+                {_order_bucket_add('OLD', -1)}
+                {_order_bucket_add('NEW', 1)}
+            END''',
+        *REBUILD_ORDER_BUCKETS_SQL
+    ]),
+    (9, 'full-text search over phones', [
+        # External-content FTS5 index: stores only the index, text is read back from phones
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS phones_fts USING fts5
+           (brand, model, description, color, storage,
+            content='phones', content_rowid='id', prefix='2 3 4')''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_insert_fts AFTER INSERT ON phones
+           BEGIN
+               INSERT INTO phones_fts (rowid, brand, model, description, color, storage)
+               VALUES (NEW.id, NEW.brand, NEW.model, NEW.description, NEW.color, NEW.storage);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS phones_delete_fts AFTER DELETE ON phones
+           BEGIN
+               INSERT INTO phones_fts (phones_fts, rowid, brand, model, description, color, storage)
+               VALUES ('delete', OLD.id, OLD.brand, OLD.model, OLD.description, OLD.color, OLD.storage);
+           END''',
+        # Only text columns: stock decrements from add_order must not touch the index
+        '''CREATE TRIGGER IF NOT EXISTS phones_update_fts
+           AFTER UPDATE OF brand, model, description, color, storage ON phones
+           BEGIN
+               INSERT INTO phones_fts (phones_fts, rowid, brand, model, description, color, storage)
+               VALUES ('delete', OLD.id, OLD.brand, OLD.model, OLD.description, OLD.color, OLD.storage);
+               INSERT INTO phones_fts (rowid, brand, model, description, color, storage)
+               VALUES (NEW.id, NEW.brand, NEW.model, NEW.description, NEW.color, NEW.storage);
+           END''',
+        "INSERT INTO phones_fts (phones_fts) VALUES ('rebuild')"
+    ]),
+    (10, 'session expiry index', [
+        'CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)'
+    ]),
+    (11, 'signed token revocations', [
+        # Times are epoch milliseconds, matching the iat/exp claims of signed tokens
+        '''CREATE TABLE IF NOT EXISTS token_revocations
+           (jti TEXT PRIMARY KEY,
+            expires_at INTEGER NOT NULL)''',
+        '''CREATE TABLE IF NOT EXISTS user_revocations
+           (user_id INTEGER PRIMARY KEY,
+            revoked_before INTEGER NOT NULL)'''
+    ]),
+    (12, 'catalog last-modified time', [
+        # Epoch seconds of the last phones write, served as Last-Modified on catalog responses
+        'ALTER TABLE catalog_version ADD COLUMN updated_at INTEGER',
+        "UPDATE catalog_version SET updated_at = CAST(strftime('%s', 'now') AS INTEGER)",
+        'DROP TRIGGER IF EXISTS phones_insert_bump_catalog',
+        'DROP TRIGGER IF EXISTS phones_update_bump_catalog',
+        'DROP TRIGGER IF EXISTS phones_delete_bump_catalog',
+        '''CREATE TRIGGER phones_insert_bump_catalog AFTER INSERT ON phones
+           BEGIN UPDATE catalog_version SET version = version + 1,
+                                            updated_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = 1; END''',
+        '''CREATE TRIGGER phones_update_bump_catalog AFTER UPDATE ON phones
+           BEGIN UPDATE catalog_version SET version = version + 1,
+                                            updated_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = 1; END''',
+        '''CREATE TRIGGER phones_delete_bump_catalog AFTER DELETE ON phones
+           BEGIN UPDATE catalog_version SET version = version + 1,
+                                            updated_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = 1; END'''
+    ]),
+    (13, 'session invalidation log', [
+        # Every live session ended early is logged by user, so the session caches of
+        # other worker processes can drop it; expired sessions removed by the reaper are not
+        '''CREATE TABLE IF NOT EXISTS session_invalidations
+           (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TRIGGER IF NOT EXISTS sessions_delete_invalidate AFTER DELETE ON sessions
+           WHEN OLD.expires_at > datetime('now')
+           BEGIN INSERT INTO session_invalidations (user_id) VALUES (OLD.user_id); END''',
+        '''CREATE TRIGGER IF NOT EXISTS sessions_expire_invalidate AFTER UPDATE OF expires_at ON sessions
+           WHEN OLD.expires_at > datetime('now') AND NEW.expires_at < OLD.expires_at
+           BEGIN INSERT INTO session_invalidations (user_id) VALUES (OLD.user_id); END'''
+    ]),
+]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the list of (version, name) pairs that were applied.
+    """
+    applied = []
+    current = schema_version(conn)
+    for version, name, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((version, name))
+    return applied
+
+
+# ========== INDEX MAINTENANCE ==========
+
+def rebuild_indexes(conn):
+    # Rebuild every index (including the full-text index) from table contents
+    # and refresh planner statistics
+    conn.execute('REINDEX')
+    conn.execute("INSERT INTO phones_fts (phones_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO phones_fts (phones_fts) VALUES ('optimize')")
+    conn.execute('ANALYZE')
+    conn.commit()
+
+def full_table_scans(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN lines that scan a table without an index."""
+    scans = []
+    for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params):
+        detail = row[-1]
+        if detail.startswith('SCAN ') and 'INDEX' not in detail:
+            scans.append(detail)
+    return scans
+
+
+# ========== DASHBOARD STATS ==========
+
+DASHBOARD_STAT_FIELDS = ['total_users', 'total_orders', 'total_revenue', 'low_stock_items', 'out_of_stock_items']
+
+def reconcile_dashboard_stats(conn):
+    """Recompute dashboard_stats from scratch; returns the fields that had drifted."""
+    select = f"SELECT {', '.join(DASHBOARD_STAT_FIELDS)} FROM dashboard_stats WHERE id = 1"
+
+    def work(c):
+        before = c.execute(select).fetchone()
+        c.execute(RECONCILE_DASHBOARD_STATS_SQL)
+        after = c.execute(select).fetchone()
+        return [field for field, old, new in zip(DASHBOARD_STAT_FIELDS, before, after)
+                if abs(old - new) > 1e-6]
+
+    return write_transaction(conn, work)
+
+def rebuild_sales_rollup(conn):
+    def work(c):
+        for statement in REBUILD_SALES_ROLLUP_SQL:
+            c.execute(statement)
+
+    write_transaction(conn, work)
+
+def rebuild_order_buckets(conn):
+    def work(c):
+        for statement in REBUILD_ORDER_BUCKETS_SQL:
+            c.execute(statement)
+
+    write_transaction(conn, work)
+
+
+# ========== SESSION REAPING ==========
+
+def reap_expired_sessions(conn, batch_size=500, pause=0.01, max_batches=None):
+    """Delete expired sessions in small batches; returns the number of rows removed.
+
+    Each batch is its own short write transaction and the loop sleeps for
+    ``pause`` seconds between batches, so request writers are never held
+    behind one long DELETE.
+    """
+    reaped = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        deleted = write_transaction(conn, lambda c: c.execute(
+            '''DELETE FROM sessions WHERE id IN
+               (SELECT id FROM sessions WHERE expires_at <= datetime('now') LIMIT ?)''',
+            (batch_size,)).rowcount)
+        reaped += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+        time.sleep(pause)
+    return reaped
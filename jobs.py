@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+# ========== BACKGROUND JOBS ==========
+
+class PeriodicJob(threading.Thread):
+    """Daemon thread that calls ``work()`` every ``interval`` seconds until stopped."""
+
+    def __init__(self, name, interval, work):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.work = work
+        self._stopped = threading.Event()
+
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_error = None
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def run_once(self):
+        try:
+            self.work()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"❌ {self.name} failed: {str(e)}")
+        finally:
+            self.runs += 1
+            self.last_run = time.time()
+
+    def stop(self):
+        self._stopped.set()
+
+    def stats(self):
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_run': self.last_run,
+            'last_error': self.last_error
+        }
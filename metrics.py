@@ -0,0 +1,204 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# ========== SQL INSTRUMENTATION ==========
+
+class QueryRecorder:
+    """Counts and times SQL statements for the request running on the current thread.
+
+    Statements taking longer than ``slow_threshold`` seconds (execution plus
+    the fetches that follow it) are printed and kept in a short history.
+    """
+
+    def __init__(self, slow_threshold=0.1, history=50):
+        self.slow_threshold = slow_threshold
+        self.slow_queries = deque(maxlen=history)
+        self.slow_total = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._local.statements = 0
+        self._local.seconds = 0.0
+
+    def stop(self):
+        return getattr(self._local, 'statements', 0), getattr(self._local, 'seconds', 0.0)
+
+    def record(self, cursor, elapsed, new_statement):
+        local = self._local
+        local.statements = getattr(local, 'statements', 0) + new_statement
+        local.seconds = getattr(local, 'seconds', 0.0) + elapsed
+        cursor.statement_seconds += elapsed
+        if self.slow_threshold and not cursor.slow_logged and cursor.statement_seconds >= self.slow_threshold:
+            cursor.slow_logged = True
+            sql = ' '.join(str(cursor.statement).split())
+            print(f"🐢 Slow query ({cursor.statement_seconds * 1000:.1f} ms): {sql[:500]}")
+            with self._lock:
+                self.slow_total += 1
+                self.slow_queries.append({'sql': sql[:500], 'ms': round(cursor.statement_seconds * 1000, 1),
+                                          'at': time.time()})
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.statement = None
+        self.statement_seconds = 0.0
+        self.slow_logged = False
+
+    def _timed(self, method, args, new_statement=False):
+        if new_statement:
+            self.statement = args[0]
+            self.statement_seconds = 0.0
+            self.slow_logged = False
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.connection.recorder.record(self, time.perf_counter() - started, new_statement)
+
+    def execute(self, *args):
+        return self._timed(super().execute, args, True)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, args, True)
+
+    def executescript(self, *args):
+        return self._timed(super().executescript, args, True)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, ())
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, ())
+
+
+def instrumented_connection(recorder):
+    """Return a sqlite3.Connection subclass whose cursors report to ``recorder``.
+
+    Pass it as ``factory`` to sqlite3.connect. Rows read by iterating a cursor
+    directly are not timed; execute and the fetch* methods are.
+    """
+
+    class InstrumentedConnection(sqlite3.Connection):
+        def cursor(self, factory=InstrumentedCursor):
+            return super().cursor(factory)
+
+        # The C shortcuts build their cursor internally, so route them through cursor()
+        def execute(self, *args):
+            return self.cursor().execute(*args)
+
+        def executemany(self, *args):
+            return self.cursor().executemany(*args)
+
+        def executescript(self, *args):
+            return self.cursor().executescript(*args)
+
+    InstrumentedConnection.recorder = recorder
+    return InstrumentedConnection
+
+
+# ========== REQUEST METRICS ==========
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """Per-endpoint latency and SQL histograms plus status counters, rendered for Prometheus."""
+
+    def __init__(self, prefix='phone_store'):
+        self.prefix = prefix
+        self.started_at = time.time()
+        self._latency = {}  # (endpoint, method) -> Histogram
+        self._statements = {}
+        self._sql_seconds = {}
+        self._statuses = {}  # (endpoint, method, status) -> count
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, seconds, statements, sql_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._statements[key] = Histogram(STATEMENT_BUCKETS)
+                self._sql_seconds[key] = Histogram(LATENCY_BUCKETS)
+            self._latency[key].observe(seconds)
+            self._statements[key].observe(statements)
+            self._sql_seconds[key].observe(sql_seconds)
+            status_key = (endpoint, method, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def render(self, extra=()):
+        """Prometheus text exposition format. ``extra`` adds (name, type, help, value) samples."""
+        lines = []
+        with self._lock:
+            self._render_histograms(lines, 'http_request_duration_seconds',
+                                    'Time from request start to response, by endpoint.', self._latency)
+            self._render_histograms(lines, 'sql_statements_per_request',
+                                    'SQL statements executed per request, by endpoint.', self._statements)
+            self._render_histograms(lines, 'sql_duration_seconds_per_request',
+                                    'Time spent in SQLite per request, by endpoint.', self._sql_seconds)
+            name = f'{self.prefix}_http_requests_total'
+            lines.append(f'# HELP {name} Responses by endpoint, method and status.')
+            lines.append(f'# TYPE {name} counter')
+            for (endpoint, method, status), count in sorted(self._statuses.items()):
+                lines.append(f'{name}{{{_labels(endpoint=endpoint, method=method, status=status)}}} {count}')
+        for metric, kind, help_text, value in [('process_start_time_seconds', 'gauge', 'Start time of this process.',
+                                                self.started_at)] + list(extra):
+            name = f'{self.prefix}_{metric}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self, lines, metric, help_text, histograms):
+        name = f'{self.prefix}_{metric}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (endpoint, method), histogram in sorted(histograms.items()):
+            labels = _labels(endpoint=endpoint, method=method)
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{_number(bound)}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {_number(histogram.sum)}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+def _labels(**labels):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
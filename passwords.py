@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Stored hashes look like "<algorithm>$<cost>$<salt>$<hash>". For PBKDF2 the cost
+# is the iteration count, for scrypt it is log2(N) with r=8, p=1. Accounts created
+# before salted hashing have a bare hex SHA-256 digest instead.
+ALGORITHMS = ('pbkdf2_sha256', 'scrypt')
+DEFAULT_COSTS = {'pbkdf2_sha256': 390000, 'scrypt': 14}
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+SALT_BYTES = 16
+
+LEGACY_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+# ========== HASH FORMAT ==========
+
+def _b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+def _derive(algorithm, cost, password, salt):
+    if algorithm == 'pbkdf2_sha256':
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, cost)
+    if algorithm == 'scrypt':
+        n = 2 ** cost
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=SCRYPT_BLOCK_SIZE, p=SCRYPT_PARALLELISM,
+                              maxmem=256 * SCRYPT_BLOCK_SIZE * n, dklen=32)
+    raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+
+def make_hash(password, algorithm='pbkdf2_sha256', cost=None):
+    cost = cost or DEFAULT_COSTS[algorithm]
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f'{algorithm}${cost}${_b64encode(salt)}${_b64encode(_derive(algorithm, cost, password, salt))}'
+
+def check_hash(password, stored):
+    if LEGACY_SHA256.fullmatch(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    try:
+        algorithm, cost, salt, expected = stored.split('$')
+        derived = _derive(algorithm, int(cost), password, _b64decode(salt))
+    except ValueError:
+        return False
+    return hmac.compare_digest(derived, _b64decode(expected))
+
+def needs_rehash(stored, algorithm, cost):
+    return not stored.startswith(f'{algorithm}${cost}$')
+
+
+# ========== HASHING POOL ==========
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    hashlib releases the GIL while deriving keys, so ``max_workers`` bounds how
+    many CPU cores logins can occupy at once. At most ``max_pending`` requests
+    may be queued or running; further callers wait up to ``queue_timeout``
+    seconds for a slot and then get PasswordHasherBusy.
+    """
+
+    def __init__(self, algorithm='pbkdf2_sha256', cost=None, max_workers=2, max_pending=32, queue_timeout=5.0):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+        self.algorithm = algorithm
+        self.cost = cost or DEFAULT_COSTS[algorithm]
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+
+        self.hashed = 0
+        self.verified = 0
+        self.upgraded = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    def hash(self, password):
+        return self._run(make_hash, password, self.algorithm, self.cost)
+
+    def verify(self, password, stored):
+        """Check a password; returns (valid, new_hash).
+
+        ``new_hash`` is set when the stored hash is a legacy digest or uses
+        another algorithm or cost, so the caller can save the upgrade. A
+        missing ``stored`` hash is checked against a dummy so unknown
+        usernames take as long as wrong passwords.
+        """
+        if stored is None:
+            self._run(check_hash, password, self._get_dummy_hash())
+            return False, None
+        if not self._run(check_hash, password, stored):
+            return False, None
+        if needs_rehash(stored, self.algorithm, self.cost):
+            new_hash = self.hash(password)
+            with self._lock:
+                self.upgraded += 1
+            return True, new_hash
+        return True, None
+
+    def _get_dummy_hash(self):
+        if self._dummy_hash is None:
+            self._dummy_hash = self._run(make_hash, secrets.token_hex(16), self.algorithm, self.cost)
+        return self._dummy_hash
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('Too many concurrent password checks')
+        try:
+            started = time.perf_counter()
+            result = self._executor.submit(function, *args).result()
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - started
+                if function is make_hash:
+                    self.hashed += 1
+                else:
+                    self.verified += 1
+            return result
+        finally:
+            self._slots.release()
+
+    def after_fork(self):
+        # Pool threads do not survive fork(), so a forked worker starts a fresh pool
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'algorithm': self.algorithm,
+                'cost': self.cost,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'hashed': self.hashed,
+                'verified': self.verified,
+                'upgraded': self.upgraded,
+                'rejected': self.rejected,
+                'busy_seconds': round(self.busy_seconds, 3)
+            }
+
+
+def default_workers():
+    # Leave at least half the cores for everything else the workers do
+    return max(1, (os.cpu_count() or 2) // 2)
@@ -0,0 +1,259 @@
+import hashlib
+import math
+import mmap
+import multiprocessing
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+# A shared-memory slot is (key hash, full_at); hash 0 marks a slot that was never used
+SLOT = struct.Struct('<Qd')
+PROBE_LENGTH = 8
+
+
+def parse_limit(text):
+    """Parse a budget like ``"10/60"`` (10 requests per 60 seconds) into (count, period).
+
+    An empty string or ``"0"`` disables the limit and returns None.
+    """
+    text = (text or '').strip()
+    if not text or text == '0':
+        return None
+    count, _, period = text.partition('/')
+    count, period = int(count), float(period or 1)
+    if count < 1 or period <= 0:
+        raise ValueError(f'Invalid rate limit {text!r}, expected "<requests>/<seconds>"')
+    return count, period
+
+
+def take(full_at, now, count, period):
+    """Take one token from a bucket that is full again at ``full_at``.
+
+    A bucket holds ``count`` tokens and refills one every ``period / count``
+    seconds. Storing only the time it will be full again makes refill-and-take
+    a single comparison, and a bucket whose ``full_at`` has passed is simply
+    full, so idle buckets can be dropped without losing anything.
+    Returns (new full_at, retry_after); retry_after is 0 when the token was taken.
+    """
+    interval = period / count
+    new_full_at = max(full_at, now) + interval
+    if new_full_at - now > period:
+        return full_at, new_full_at - now - period
+    return new_full_at, 0.0
+
+
+# ========== BUCKET STORES ==========
+
+class MemoryBuckets:
+    """Buckets in a dict, private to this process."""
+
+    name = 'memory'
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> full_at
+        self._lock = threading.Lock()
+
+    def take(self, key, now, count, period):
+        with self._lock:
+            full_at, retry_after = take(self._buckets.get(key, 0.0), now, count, period)
+            self._buckets[key] = full_at
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def after_fork(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def size(self):
+        return len(self._buckets)
+
+
+class SharedMemoryBuckets:
+    """Buckets in an anonymous shared mapping, seen by every process forked after it is created.
+
+    server.py imports the app before forking, so all workers share one table.
+    The table is a fixed array of ``slots``; a key probes a few slots from its
+    hash and, when they are all busy, takes over the one that is full soonest.
+    """
+
+    name = 'shared'
+
+    def __init__(self, slots=65536, lock_timeout=0.05):
+        self.slots = slots
+        self.lock_timeout = lock_timeout
+        self._map = mmap.mmap(-1, slots * SLOT.size)
+        self._lock = multiprocessing.Lock()
+
+    def _hash(self, key):
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def take(self, key, now, count, period):
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+        # A worker killed while holding the lock must not stall the others: give up and let the request in
+        if not self._lock.acquire(timeout=self.lock_timeout):
+            raise TimeoutError('rate limit table is locked')
+        try:
+            target, full_at, soonest = None, 0.0, None
+            for i in range(PROBE_LENGTH):
+                offset = (start + i) % self.slots * SLOT.size
+                slot_hash, slot_full_at = SLOT.unpack_from(self._map, offset)
+                if slot_hash == key_hash:
+                    target, full_at = offset, slot_full_at
+                    break
+                if target is None and (slot_hash == 0 or slot_full_at <= now):
+                    target = offset
+                if soonest is None or slot_full_at < soonest[1]:
+                    soonest = (offset, slot_full_at)
+            if target is None:
+                target = soonest[0]
+            full_at, retry_after = take(full_at, now, count, period)
+            SLOT.pack_into(self._map, target, key_hash, full_at)
+            return retry_after
+        finally:
+            self._lock.release()
+
+    def after_fork(self):
+        # The mapping and the lock are inherited on purpose
+        pass
+
+    def size(self):
+        # An unlocked scan: good enough for a stats figure
+        now = time.time()
+        return sum(1 for i in range(self.slots) if SLOT.unpack_from(self._map, i * SLOT.size)[1] > now)
+
+
+class SQLiteBuckets:
+    """Buckets in their own SQLite file, shared by every process on the host.
+
+    Kept apart from the store's database so that throttling never competes
+    with orders and sessions for its write lock. Durability is not needed,
+    so the file runs with synchronous=OFF.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, busy_timeout=0.05, prune_every=1000):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS rate_limit_buckets '
+                         '(key TEXT PRIMARY KEY, full_at REAL NOT NULL) WITHOUT ROWID')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, now, count, period):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT full_at FROM rate_limit_buckets WHERE key = ?', (key,)).fetchone()
+            full_at, retry_after = take(row[0] if row else 0.0, now, count, period)
+            if not retry_after:
+                conn.execute('INSERT OR REPLACE INTO rate_limit_buckets (key, full_at) VALUES (?, ?)',
+                             (key, full_at))
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                conn.execute('DELETE FROM rate_limit_buckets WHERE full_at <= ?', (now,))
+            conn.execute('COMMIT')
+            return retry_after
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def after_fork(self):
+        # Connections must not cross a fork; each worker opens its own
+        self._local = threading.local()
+
+    def size(self):
+        return self._connect().execute('SELECT COUNT(*) FROM rate_limit_buckets WHERE full_at > ?',
+                                       (time.time(),)).fetchone()[0]
+
+
+# ========== RATE LIMITER ==========
+
+class RateLimiter:
+    """Token-bucket admission control with per-route, per-scope budgets.
+
+    ``limits`` maps a route name to ``{scope: (count, period)}``, for example
+    ``{'login': {'ip': (20, 60), 'user': (5, 60)}}``. ``check`` takes one token
+    from the bucket of every scope it is given a key for and returns how many
+    seconds to wait, or 0 when the request may proceed. If the bucket store
+    fails the request is let through, so a broken limiter never takes the
+    API down with it.
+    """
+
+    def __init__(self, buckets, limits, enabled=True):
+        self.buckets = buckets
+        self.limits = limits
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.allowed = {}
+        self.limited = {}
+        self.errors = 0
+
+    def check(self, route, keys):
+        budgets = self.limits.get(route)
+        if not self.enabled or not budgets:
+            return 0.0
+        now = time.time()
+        retry_after = 0.0
+        limited_by = None
+        for scope, value in keys.items():
+            budget = budgets.get(scope)
+            if budget is None or value is None:
+                continue
+            try:
+                wait = self.buckets.take(f'{route}:{scope}:{value}', now, *budget)
+            except (sqlite3.Error, TimeoutError):
+                with self._lock:
+                    self.errors += 1
+                continue
+            if wait > retry_after:
+                retry_after, limited_by = wait, scope
+        with self._lock:
+            if limited_by is None:
+                self.allowed[route] = self.allowed.get(route, 0) + 1
+            else:
+                key = f'{route}:{limited_by}'
+                self.limited[key] = self.limited.get(key, 0) + 1
+        return retry_after
+
+    def after_fork(self):
+        self.buckets.after_fork()
+        with self._lock:
+            self.allowed = {}
+            self.limited = {}
+            self.errors = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'store': self.buckets.name,
+                'limits': {route: {scope: f'{count}/{period:g}' for scope, (count, period) in budgets.items()}
+                           for route, budgets in self.limits.items()},
+                'allowed': dict(self.allowed),
+                'limited': dict(self.limited),
+                'errors': self.errors,
+                'active_buckets': self.buckets.size()
+            }
+
+
+def retry_after_header(seconds):
+    # Retry-After takes whole seconds; round up so a client retrying on time gets through
+    return str(max(1, math.ceil(seconds)))
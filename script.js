@@ -2,6 +2,10 @@ const API_BASE = 'http://localhost:5000/api';
 let currentUser = null;
 let currentOrderPhone = null;
 let allPhones = [];
+// The catalog is fetched a page at a time: phonesQuery is the listing URL, phonesNextCursor its next page
+const PHONES_PAGE_SIZE = 24;
+let phonesQuery = null;
+let phonesNextCursor = null;
 let isEditMode = false;
 let currentEditPhoneId = null;
 
@@ -207,21 +211,17 @@ async function loadAdminDashboard() {
     if (!currentUser || !currentUser.is_admin) return;
     
     try {
-        // Load admin stats
-        const ordersResponse = await apiRequest(`${API_BASE}/orders`);
-        const ordersData = await ordersResponse.json();
-        const phonesResponse = await fetch(`${API_BASE}/phones`);
-        const phonesData = await phonesResponse.json();
-        
-        const totalOrders = ordersData.orders.length;
-        const totalPhones = phonesData.phones.length;
-        const totalRevenue = ordersData.orders.reduce((sum, order) => sum + parseFloat(order.total_price || 0), 0);
+        // Load admin stats: totals come from the server's counters, the phone count from the stock report
+        const statsResponse = await apiRequest(`${API_BASE}/admin/stats`);
+        const stats = await statsResponse.json();
+        const stockResponse = await apiRequest(`${API_BASE}/reports/stock`);
+        const stockData = await stockResponse.json();
         
         // Update dashboard stats
-        document.getElementById('admin-total-orders').textContent = totalOrders;
-        document.getElementById('admin-total-phones').textContent = totalPhones;
-        document.getElementById('admin-total-revenue').textContent = `$${totalRevenue.toFixed(2)}`;
-        document.getElementById('admin-total-customers').textContent = '0'; // You might want to implement user counting
+        document.getElementById('admin-total-orders').textContent = stats.total_orders;
+        document.getElementById('admin-total-phones').textContent = stockData.stock.length;
+        document.getElementById('admin-total-revenue').textContent = `$${parseFloat(stats.total_revenue || 0).toFixed(2)}`;
+        document.getElementById('admin-total-customers').textContent = stats.total_users;
         
     } catch (error) {
         console.error('Error loading admin dashboard:', error);
@@ -235,16 +235,38 @@ function manageInventory() {
 // ========== PHONE MANAGEMENT FUNCTIONS ==========
 async function loadPhones() {
     try {
-        const response = await fetch(`${API_BASE}/phones`);
-        const data = await response.json();
-        allPhones = data.phones || [];
-        displayPhones(allPhones);
+        await loadPhonesPage(`${API_BASE}/phones?limit=${PHONES_PAGE_SIZE}`, false);
     } catch (error) {
         console.error('Error loading phones:', error);
         showFormMessage('Error loading phones. Please make sure the server is running.', 'error');
     }
 }
 
+// Fetch the first page of a listing, or with append the page after phonesNextCursor
+async function loadPhonesPage(url, append) {
+    const pageUrl = append ? `${url}&cursor=${encodeURIComponent(phonesNextCursor)}` : url;
+    const response = await fetch(pageUrl);
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || 'Failed to load phones');
+    
+    phonesQuery = url;
+    phonesNextCursor = data.next_cursor || null;
+    allPhones = append ? allPhones.concat(data.phones || []) : (data.phones || []);
+    displayPhones(allPhones);
+    
+    const loadMoreBtn = document.getElementById('load-more-phones');
+    if (loadMoreBtn) loadMoreBtn.style.display = phonesNextCursor ? '' : 'none';
+}
+
+async function loadMorePhones() {
+    if (!phonesQuery || !phonesNextCursor) return;
+    try {
+        await loadPhonesPage(phonesQuery, true);
+    } catch (error) {
+        console.error('Error loading more phones:', error);
+    }
+}
+
 function displayPhones(phones) {
     const container = document.getElementById('phones-container');
     if (!container) return;
@@ -1176,9 +1198,9 @@ function displaySalesReport(sales) {
 
 async function loadStockReport() {
     try {
-        const response = await fetch(`${API_BASE}/phones`);
+        const response = await apiRequest(`${API_BASE}/reports/stock`);
         const data = await response.json();
-        displayStockReport(data.phones);
+        displayStockReport(data.stock);
     } catch (error) {
         console.error('Error loading stock report:', error);
     }
@@ -1325,16 +1347,13 @@ async function apiRequest(url, options = {}) {
 
 async function checkBackendStatus() {
     try {
+        // /api/db-check is admin only, so page loads just check that the server is up
         const healthResponse = await fetch(`${API_BASE}/health`);
-        const dbResponse = await fetch(`${API_BASE}/db-check`);
-        
         const health = await healthResponse.json();
-        const db = await dbResponse.json();
         
         console.log('🔧 Backend Status:', health);
-        console.log('📊 Database Status:', db);
         
-        return { health, db };
+        return { health };
     } catch (error) {
         console.error('❌ Cannot connect to backend:', error);
         alert('Cannot connect to backend server. Please make sure the Flask server is running on http://localhost:5000');
@@ -1359,7 +1378,7 @@ function setupFAQ() {
 // ========== HOME PAGE FUNCTIONS ==========
 async function loadFeaturedPhones() {
     try {
-        const response = await fetch(`${API_BASE}/phones`);
+        const response = await fetch(`${API_BASE}/phones?limit=3`);
         const data = await response.json();
         const featuredContainer = document.getElementById('featured-phones');
         
@@ -1446,41 +1465,36 @@ async function loadSamplePhones() {
     }
 }
 
-// Simple filter functions
-function applyFilters() {
-    const searchTerm = document.getElementById('search-input').value.toLowerCase();
+// Filter functions - search, brand, price range and sort are evaluated by the server
+async function applyFilters() {
+    const searchTerm = document.getElementById('search-input').value.trim();
     const brandFilter = document.getElementById('brand-filter').value;
     const minPrice = document.getElementById('min-price-filter').value;
     const maxPrice = document.getElementById('max-price-filter').value;
-    const sortBy = document.getElementById('sort-filter').value;
-    
-    let filteredPhones = allPhones.filter(phone => {
-        const matchesSearch = phone.brand.toLowerCase().includes(searchTerm) || 
-                             phone.model.toLowerCase().includes(searchTerm) ||
-                             phone.description.toLowerCase().includes(searchTerm);
-        const matchesBrand = !brandFilter || phone.brand === brandFilter;
-        const matchesMinPrice = !minPrice || phone.price >= parseFloat(minPrice);
-        const matchesMaxPrice = !maxPrice || phone.price <= parseFloat(maxPrice);
-        
-        return matchesSearch && matchesBrand && matchesMinPrice && matchesMaxPrice;
-    });
-    
-    // Sort the filtered phones
-    filteredPhones.sort((a, b) => {
-        switch (sortBy) {
-            case 'price_low':
-                return a.price - b.price;
-            case 'price_high':
-                return b.price - a.price;
-            case 'name':
-                return a.model.localeCompare(b.model);
-            case 'newest':
-            default:
-                return b.id - a.id;
-        }
-    });
+    const sortFilter = document.getElementById('sort-filter');
+    
+    const params = new URLSearchParams();
+    if (brandFilter) params.append('brand', brandFilter);
+    if (minPrice) params.append('min_price', minPrice);
+    if (maxPrice) params.append('max_price', maxPrice);
+    params.append('limit', PHONES_PAGE_SIZE);
+    
+    // Search results come back ranked by relevance, so the sort choice is disabled while searching
+    let url;
+    setSearchSortState(Boolean(searchTerm));
+    if (searchTerm) {
+        params.append('q', searchTerm);
+        url = `${API_BASE}/phones/search?${params}`;
+    } else {
+        params.append('sort', sortFilter.value || 'newest');
+        url = `${API_BASE}/phones?${params}`;
+    }
     
-    displayPhones(filteredPhones);
+    try {
+        await loadPhonesPage(url, false);
+    } catch (error) {
+        console.error('Error filtering phones:', error);
+    }
 }
 
 function clearFilters() {
@@ -1489,8 +1503,15 @@ function clearFilters() {
     document.getElementById('min-price-filter').value = '';
     document.getElementById('max-price-filter').value = '';
     document.getElementById('sort-filter').value = 'newest';
+    setSearchSortState(false);
     
-    displayPhones(allPhones);
+    loadPhones();
+}
+
+function setSearchSortState(searching) {
+    const sortFilter = document.getElementById('sort-filter');
+    sortFilter.disabled = searching;
+    sortFilter.title = searching ? 'Search results are sorted by relevance' : '';
 }
 
 // Temporary debug function - add this to test deletion
@@ -0,0 +1,65 @@
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; encoding falls back to the stdlib json module
+    orjson = None
+
+
+# ========== ROW MAPPERS ==========
+
+def row_mapper(fields, converters=None):
+    """Compile a function turning a result tuple into a dict keyed by ``fields``.
+
+    The generated function is a single dict display (``{'id': r[0], ...}``),
+    about twice as fast as ``dict(zip(fields, row))``. ``converters`` maps a
+    field name to a callable applied to that column, e.g. ``{'is_admin': bool}``.
+    """
+    converters = converters or {}
+    namespace = {}
+    items = []
+    for i, field in enumerate(fields):
+        if field in converters:
+            namespace[f'convert_{i}'] = converters[field]
+            items.append(f'{field!r}: convert_{i}(row[{i}])')
+        else:
+            items.append(f'{field!r}: row[{i}]')
+    return eval(f"lambda row: {{{', '.join(items)}}}", namespace)
+
+
+# ========== JSON ENCODING ==========
+
+def dumps(obj, default=None):
+    """Encode ``obj`` as compact UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider behind jsonify and request.json.
+
+    Responses are always compact (no pretty-printing in debug mode) and keep
+    dict insertion order instead of sorting keys.
+    """
+
+    sort_keys = False
+    ensure_ascii = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return dumps(obj, self.default).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, self.default), mimetype=self.mimetype)
@@ -0,0 +1,253 @@
+"""Production server for the phone store API.
+
+A pre-fork master runs init_db once, opens the listening socket and forks
+worker processes that all accept from it. Each worker serves requests on a
+fixed pool of threads with its own database connections.
+
+    python server.py --bind 0.0.0.0:8000 --workers 4 --threads 8
+
+Signals to the master:
+    TERM / INT  graceful shutdown: workers finish in-flight requests, then exit
+    HUP         rolling restart: new workers are started, then the old ones are stopped
+
+Workers are recycled after --max-requests requests (plus random jitter so
+they don't all restart together), and replaced if they die.
+"""
+import argparse
+import os
+import random
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import app as phone_store
+
+
+# ========== WORKER ==========
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are dropped after this many seconds so they can't pin a pool thread
+    timeout = 5
+    access_log = True
+
+    def log_request(self, *args, **kwargs):
+        if self.access_log:
+            super().log_request(*args, **kwargs)
+
+
+class PooledWSGIServer(socketserver.ThreadingMixIn, BaseWSGIServer):
+    """Serves connections on a fixed-size thread pool instead of a thread per connection."""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, handler, fd):
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        # Let in-flight requests finish before the socket goes away. BaseWSGIServer.__init__
+        # also calls this for an inherited fd, before the pool exists.
+        executor = getattr(self, '_executor', None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+        super().server_close()
+
+
+def run_worker(listener, args, slot):
+    # The master decides when workers stop; Ctrl-C reaches the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    random.seed()
+
+    # Background jobs only need to run in one place
+    phone_store.init_worker(run_jobs=slot == 0)
+
+    max_requests = args.max_requests
+    if max_requests:
+        max_requests += random.randint(0, args.max_requests_jitter)
+    served = 0
+    lock = threading.Lock()
+    stopping = threading.Event()
+
+    def stop(*_):
+        if not stopping.is_set():
+            stopping.set()
+            # shutdown() waits for serve_forever to return, so it can't run on the serving thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def counted(environ, start_response):
+        nonlocal served
+        with lock:
+            served += 1
+            recycle = max_requests and served >= max_requests
+        if recycle:
+            stop()
+        return phone_store.app(environ, start_response)
+
+    handler = type('Handler', (WorkerRequestHandler,), {'timeout': args.keepalive,
+                                                         'access_log': args.access_log})
+    host, port = listener.getsockname()[:2]
+    server = PooledWSGIServer(host, port, counted, args.threads, handler, listener.fileno())
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"👷 Worker {slot} (pid {os.getpid()}) serving with {args.threads} threads")
+    server.serve_forever(poll_interval=0.5)
+    phone_store.shutdown_worker()
+    print(f"👋 Worker {slot} (pid {os.getpid()}) exited after {served} requests")
+
+
+# ========== MASTER ==========
+
+class Master:
+    def __init__(self, listener, args):
+        self.listener = listener
+        self.args = args
+        self.workers = {}  # pid -> slot
+        self.retiring = set()
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.listener, self.args, slot)
+            except BaseException as e:
+                print(f"❌ Worker {slot} crashed: {str(e)}")
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        self.workers[pid] = slot
+        return pid
+
+    def signal_workers(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            slot = self.workers.pop(pid, None)
+            if slot is None:
+                continue
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif not self.stopping:
+                if os.waitstatus_to_exitcode(status) != 0:
+                    print(f"⚠️ Worker {slot} (pid {pid}) died, restarting")
+                    # Don't spin if workers crash right after starting
+                    time.sleep(1)
+                self.spawn(slot)
+
+    def rolling_restart(self):
+        old = list(self.workers.items())
+        print(f"🔄 Restarting {len(old)} workers")
+        for pid, slot in old:
+            self.retiring.add(pid)
+            self.spawn(slot)
+            self.signal_workers([pid], signal.SIGTERM)
+
+    def shutdown(self):
+        print("🛑 Shutting down, waiting for in-flight requests...")
+        self.signal_workers(list(self.workers), signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        if self.workers:
+            print(f"⚠️ Killing {len(self.workers)} workers that did not stop in time")
+            self.signal_workers(list(self.workers), signal.SIGKILL)
+            while self.workers:
+                self.reap()
+                time.sleep(0.05)
+
+    def run(self):
+        def request_stop(*_):
+            self.stopping = True
+
+        def request_reload(*_):
+            self.reloading = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+        while not self.stopping:
+            if self.reloading:
+                self.reloading = False
+                self.rolling_restart()
+            self.reap()
+            time.sleep(0.2)
+        self.shutdown()
+
+
+def parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host.strip('[]') or '0.0.0.0', int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the phone store API with multiple worker processes.')
+    parser.add_argument('--bind', default=os.environ.get('SERVER_BIND', '127.0.0.1:5000'), help='host:port')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('SERVER_WORKERS', os.cpu_count() or 1)),
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SERVER_THREADS', 8)),
+                        help='request threads per worker')
+    parser.add_argument('--max-requests', type=int, default=int(os.environ.get('SERVER_MAX_REQUESTS', 0)),
+                        help='recycle a worker after this many requests (0 = never)')
+    parser.add_argument('--max-requests-jitter', type=int,
+                        default=int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 0)))
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=float(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30)),
+                        help='seconds to wait for workers to finish before killing them')
+    parser.add_argument('--keepalive', type=float, default=float(os.environ.get('SERVER_KEEPALIVE', 5)),
+                        help='seconds an idle keep-alive connection is kept open')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--no-access-log', dest='access_log', action='store_false')
+    args = parser.parse_args(argv)
+
+    if args.threads > phone_store.app.config['DB_POOL_SIZE']:
+        print(f"⚠️ {args.threads} threads share {phone_store.app.config['DB_POOL_SIZE']} database connections "
+              f"per worker; consider DB_POOL_SIZE={args.threads}")
+
+    print("🚀 Starting PhoneTech Server...")
+    phone_store.init_db()
+
+    host, port = parse_bind(args.bind)
+    listener = socket.create_server((host, port), family=socket.AF_INET6 if ':' in host else socket.AF_INET,
+                                    backlog=args.backlog, reuse_port=False)
+    listener.set_inheritable(True)
+    print(f"✅ Listening on http://{args.bind} with {args.workers} workers x {args.threads} threads")
+
+    try:
+        Master(listener, args).run()
+    finally:
+        listener.close()
+
+
+if __name__ == '__main__':
+    main()
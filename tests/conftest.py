@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app reads its configuration at import time, so point it at a scratch database first
+DATABASE_DIR = tempfile.mkdtemp(prefix='phone_store_test_')
+os.environ['PHONE_STORE_DB'] = os.path.join(DATABASE_DIR, 'phone_store.db')
+os.environ.setdefault('PASSWORD_HASH_COST', '1000')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as phone_store
+
+
+@pytest.fixture(scope='session')
+def client():
+    phone_store.init_db()
+    return phone_store.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(client):
+    response = client.post('/api/login', json={'username': 'admin', 'password': 'admin123'})
+    return {'Authorization': f"Bearer {response.get_json()['session_token']}"}
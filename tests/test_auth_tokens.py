@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+import app as phone_store
+from tokens import RevocationList, sign_token
+
+FORGED_ADMIN = {'id': 999, 'username': 'mallory', 'email': 'mallory@example.com', 'is_admin': True}
+PRIVATE_KEY = 'test-private-signing-key'
+
+
+@pytest.fixture
+def signed_mode(monkeypatch):
+    monkeypatch.setitem(phone_store.app.config, 'AUTH_TOKEN_MODE', 'signed')
+    monkeypatch.setattr(phone_store.app, 'secret_key', PRIVATE_KEY)
+
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_session_mode_rejects_token_signed_with_default_key(client):
+    token = sign_token(phone_store.DEFAULT_SECRET_KEY, FORGED_ADMIN, 3600)
+    assert client.get('/api/admin/users', headers=bearer(token)).status_code == 401
+    assert client.get('/api/user', headers=bearer(token)).status_code == 401
+
+
+def test_session_mode_rejects_token_signed_with_server_key(client):
+    token = sign_token(phone_store.app.secret_key, FORGED_ADMIN, 3600)
+    assert client.get('/api/admin/users', headers=bearer(token)).status_code == 401
+
+
+def test_signed_mode_rejects_token_signed_with_default_key(client, signed_mode):
+    token = sign_token(phone_store.DEFAULT_SECRET_KEY, FORGED_ADMIN, 3600)
+    assert client.get('/api/admin/users', headers=bearer(token)).status_code == 401
+    assert client.get('/api/user', headers=bearer(token)).status_code == 401
+
+
+def test_signed_mode_accepts_token_signed_with_server_key(client, signed_mode):
+    token = sign_token(PRIVATE_KEY, FORGED_ADMIN, 3600)
+    assert client.get('/api/user', headers=bearer(token)).status_code == 200
+
+
+def test_signed_mode_refuses_default_secret(monkeypatch):
+    monkeypatch.setitem(phone_store.app.config, 'AUTH_TOKEN_MODE', 'signed')
+    monkeypatch.setattr(phone_store.app, 'secret_key', phone_store.DEFAULT_SECRET_KEY)
+    with pytest.raises(RuntimeError):
+        phone_store.check_token_secret()
+
+
+def test_uncommitted_user_revocation_is_not_applied():
+    revocations = RevocationList()
+    conn = sqlite3.connect(phone_store.app.config['DATABASE'])
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        revoked_before = revocations.revoke_user(conn, 42, commit=False)
+        conn.rollback()
+    finally:
+        conn.close()
+    payload = {'jti': 'x', 'uid': 42, 'iat': revoked_before - 1}
+    assert not revocations.is_revoked(payload)
+    revocations.record_user(42, revoked_before)
+    assert revocations.is_revoked(payload)
+
+
+def test_profile_update_revokes_old_signed_token(client, signed_mode):
+    login = client.post('/api/login', json={'username': 'user', 'password': 'user123'}).get_json()
+    old = bearer(login['session_token'])
+    response = client.put('/api/user/profile', headers=old,
+                          json={'username': login['user']['username'], 'email': login['user']['email']})
+    assert response.status_code == 200
+    assert client.get('/api/user', headers=old).status_code == 401
+    assert client.get('/api/user', headers=bearer(response.get_json()['session_token'])).status_code == 200
@@ -0,0 +1,39 @@
+import io
+import json
+import sqlite3
+
+import app as phone_store
+import catalog_import
+from catalog_import import import_phones, read_rows
+
+
+def phone_row(sku, **fields):
+    row = {'sku': sku, 'brand': 'Test', 'model': f'Model {sku}', 'price': 100, 'storage': '128GB',
+           'color': 'Black', 'stock_quantity': 5}
+    row.update(fields)
+    return json.dumps(row)
+
+
+def test_non_scalar_field_is_reported_and_other_rows_imported(client, admin_headers):
+    body = '\n'.join([phone_row('IMP-1'), phone_row('IMP-2', brand={'x': 1}), phone_row('IMP-3')])
+    response = client.post('/api/admin/phones/import', headers=admin_headers, data=body,
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report['processed'] == 3
+    assert report['imported'] == 2
+    assert report['errors'] == [{'line': 2, 'error': 'Field "brand" must be text'}]
+
+
+def test_binding_error_in_chunk_is_replayed_row_by_row(monkeypatch):
+    # A value validate_row lets through but SQLite cannot bind fails only its own line
+    monkeypatch.setattr(catalog_import, 'text_field', lambda row, field: row.get(field) or '')
+    conn = sqlite3.connect(phone_store.app.config['DATABASE'])
+    try:
+        rows = read_rows(io.StringIO('\n'.join([phone_row('IMP-4'), phone_row('IMP-5', color=['x']),
+                                                phone_row('IMP-6')])), 'jsonl')
+        report = import_phones(conn, rows)
+    finally:
+        conn.close()
+    assert report['imported'] == 2
+    assert [error['line'] for error in report['errors']] == [2]
@@ -0,0 +1,28 @@
+import app as phone_store
+
+# Keyset cursor older than any order, so the export matches no rows
+PAST_LAST_ORDER = phone_store.encode_cursor(['0000-00-00 00:00:00', 0])
+
+
+def test_csv_export_has_header_and_rows(client, admin_headers):
+    response = client.get('/api/reports/orders', headers=admin_headers, query_string={'format': 'csv'})
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == ','.join(phone_store.ORDER_FIELDS)
+    assert len(lines) > 1
+
+
+def test_empty_csv_export_has_header(client, admin_headers):
+    response = client.get('/api/reports/orders', headers=admin_headers,
+                          query_string={'format': 'csv', 'cursor': PAST_LAST_ORDER})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.get_data(as_text=True) == ','.join(phone_store.ORDER_FIELDS) + '\r\n'
+
+
+def test_empty_ndjson_export_is_empty(client, admin_headers):
+    response = client.get('/api/reports/orders', headers=admin_headers,
+                          query_string={'format': 'ndjson', 'cursor': PAST_LAST_ORDER})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.get_data() == b''
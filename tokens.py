@@ -0,0 +1,127 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+
+# Signed tokens look like "v1.<payload>.<signature>"; database session tokens are plain hex,
+# so both kinds can be told apart without a lookup.
+TOKEN_PREFIX = 'v1.'
+
+
+# ========== SIGNED SESSION TOKENS ==========
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _signature(secret, message):
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).digest()
+
+def now_ms():
+    return int(time.time() * 1000)
+
+def is_signed_token(token):
+    return token.startswith(TOKEN_PREFIX)
+
+def sign_token(secret, user, ttl):
+    """Issue a token carrying the user's identity, admin flag and expiry."""
+    issued_at = now_ms()
+    payload = {
+        'uid': user['id'],
+        'usr': user['username'],
+        'eml': user['email'],
+        'adm': bool(user['is_admin']),
+        'iat': issued_at,
+        'exp': issued_at + int(ttl * 1000),
+        'jti': secrets.token_hex(8)
+    }
+    body = TOKEN_PREFIX + _b64encode(json.dumps(payload, separators=(',', ':')).encode())
+    return f'{body}.{_b64encode(_signature(secret, body))}'
+
+def verify_token(secret, token):
+    """Return the payload of a correctly signed, unexpired token, else None."""
+    body, _, signature = token.rpartition('.')
+    if not body.startswith(TOKEN_PREFIX):
+        return None
+    try:
+        valid = hmac.compare_digest(_b64decode(signature), _signature(secret, body))
+        payload = json.loads(_b64decode(body[len(TOKEN_PREFIX):])) if valid else None
+    except (ValueError, TypeError):
+        return None
+    if not payload or payload.get('exp', 0) <= now_ms():
+        return None
+    return payload
+
+def token_user(payload):
+    return {'id': payload['uid'], 'username': payload['usr'], 'email': payload['eml'], 'is_admin': payload['adm']}
+
+
+# ========== REVOCATION LIST ==========
+
+class RevocationList:
+    """In-memory mirror of the token_revocations and user_revocations tables.
+
+    Revocations made by this process apply immediately; those made by other
+    workers or nodes are picked up when the mirror is reloaded, at most every
+    ``poll_interval`` seconds.
+    """
+
+    def __init__(self, poll_interval=2.0):
+        self.poll_interval = poll_interval
+        self._tokens = {}  # jti -> expires_at (ms)
+        self._users = {}  # user_id -> tokens issued before this time (ms) are revoked
+        self._loaded_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def refresh(self, get_conn, force=False):
+        # get_conn is only called when a reload is due, so most requests never touch the database
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._loaded_at < self.poll_interval:
+                return
+        conn = get_conn()
+        tokens = dict(conn.execute('SELECT jti, expires_at FROM token_revocations WHERE expires_at > ?',
+                                   (now_ms(),)).fetchall())
+        users = dict(conn.execute('SELECT user_id, revoked_before FROM user_revocations').fetchall())
+        with self._lock:
+            self._tokens = tokens
+            self._users = users
+            self._loaded_at = now
+
+    def is_revoked(self, payload):
+        with self._lock:
+            return (payload['jti'] in self._tokens
+                    or payload['iat'] < self._users.get(payload['uid'], 0))
+
+    def revoke_token(self, conn, payload):
+        conn.execute('INSERT OR IGNORE INTO token_revocations (jti, expires_at) VALUES (?, ?)',
+                     (payload['jti'], payload['exp']))
+        conn.commit()
+        with self._lock:
+            self._tokens[payload['jti']] = payload['exp']
+
+    def revoke_user(self, conn, user_id, commit=True):
+        # Every token the user holds right now stops working; tokens issued afterwards are fine.
+        # With commit=False the caller commits and then passes the returned time to record_user.
+        revoked_before = now_ms()
+        conn.execute('''INSERT INTO user_revocations (user_id, revoked_before) VALUES (?, ?)
+                        ON CONFLICT (user_id) DO UPDATE SET revoked_before = excluded.revoked_before''',
+                     (user_id, revoked_before))
+        if commit:
+            conn.commit()
+            self.record_user(user_id, revoked_before)
+        return revoked_before
+
+    def record_user(self, user_id, revoked_before):
+        # Mirror a committed user revocation, so this process applies it before the next reload
+        with self._lock:
+            self._users[user_id] = max(self._users.get(user_id, 0), revoked_before)
+
+    def stats(self):
+        with self._lock:
+            return {'revoked_tokens': len(self._tokens), 'revoked_users': len(self._users)}